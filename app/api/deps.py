@@ -34,6 +34,14 @@ def get_current_user(
         ) from exc
 
 
+def has_role(user: dict, role: str) -> bool:
+    """Return True if the decoded token carries `role` (string or list claim)."""
+    claim = user.get("role") or user.get("roles")
+    if isinstance(claim, list):
+        return role in claim
+    return claim == role
+
+
 def require_role(allowed: List[str]) -> Callable:
     """
     Return a FastAPI dependency that enforces a user's role.
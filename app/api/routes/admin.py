@@ -0,0 +1,43 @@
+"""Operational endpoints (cache, admission and idempotency stats, request profiles)
+for doctors / admins."""
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
+from app.api.deps import require_role
+from app.core.admission import admission_controller
+from app.core.profiling import profile_store
+from app.services.cache import cache_stats
+from app.services.idempotency import idempotency_store
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+@router.get("/cache")
+async def get_cache_stats(user=Depends(require_role(["doctor", "admin"]))):
+    return {"collections": cache_stats()}
+
+
+@router.get("/admission")
+async def get_admission_stats(user=Depends(require_role(["doctor", "admin"]))):
+    return admission_controller.snapshot()
+
+
+@router.get("/idempotency")
+async def get_idempotency_stats(user=Depends(require_role(["doctor", "admin"]))):
+    return idempotency_store.stats
+
+
+@router.get("/profiles")
+async def list_profiles(user=Depends(require_role(["doctor", "admin"]))):
+    return {"items": profile_store.list()}
+
+
+@router.get("/profiles/{profile_id}")
+async def download_profile(profile_id: str, user=Depends(require_role(["doctor", "admin"]))):
+    """Collapsed stacks, e.g. for `flamegraph.pl` or speedscope.app."""
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(
+        profile["collapsed"],
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.folded"'},
+    )
@@ -0,0 +1,63 @@
+"""
+Server push routes.
+
+Clients open a long-lived Server-Sent Events stream instead of polling
+`GET /health_records`. Each event is a small JSON object, e.g.
+
+    event: record.updated
+    data: {"type": "record.updated", "record_id": "...", "patient_id": "...",
+           "nutrition_approved": true, "timestamp": "..."}
+
+Doctors receive events for every patient (or only the `patient_id` values
+they pass); other users only receive events for their own records.
+"""
+
+import asyncio
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+
+from app.api.deps import get_current_user, has_role
+from app.core.config import settings
+from app.services.events import event_bus
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+
+@router.get("/stream")
+async def stream_events(
+    request: Request,
+    patient_id: Optional[List[str]] = Query(None),
+    user=Depends(get_current_user),
+):
+    if has_role(user, "doctor"):
+        patient_ids = patient_id  # None -> everything
+    else:
+        patient_ids = [user["uid"]]
+
+    sub = event_bus.subscribe(patient_ids)
+
+    async def _stream():
+        try:
+            yield ": connected\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(
+                        sub.queue.get(), timeout=settings.event_keepalive_seconds
+                    )
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    # Comment line keeps proxies from closing idle connections
+                    yield ": keepalive\n\n"
+                    continue
+                yield message
+        finally:
+            event_bus.unsubscribe(sub)
+
+    return StreamingResponse(
+        _stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
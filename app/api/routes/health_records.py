@@ -9,17 +9,30 @@ ML generates a suggested nutrition + meal plan.
 Doctor approval is required before the plan is visible to patients.
 """
 
-from fastapi import APIRouter, Depends, Body, HTTPException
+from fastapi import APIRouter, Depends, Body, Header, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from datetime import datetime, timezone
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 
-from app.api.deps import get_current_user, require_role
+from app.api.deps import get_current_user, require_role, has_role
 from app.core import firebase
+from app.core.responses import document_list_response
 from app.models.health_data import HealthData
-from app.services.meal_plan_pipeline import build_meal_plan
+from app.models.review import BulkReviewRequest
+from app.services import vitals_service
+from app.services.events import event_bus
+from app.services.health_service import health_service
+from app.services.idempotency import IdempotencyKeyReused, idempotency_store, request_key
+from app.services.meal_plan_pipeline import (
+    TokenBudgetExceeded,
+    build_meal_plan,
+    build_multi_day_meal_plan,
+)
 
 router = APIRouter(prefix="/health_records", tags=["health_records"])
 
+BATCH_LIMIT = 500  # max writes per Firestore WriteBatch
+
 
 def _bool_to_yesno(v: Optional[bool]) -> str:
     if v is True:
@@ -36,13 +49,8 @@ def _first(*vals):
     return None
 
 
-@router.post("/", status_code=201)
-async def submit_record(payload: HealthData = Body(...), user=Depends(get_current_user)):
-    if user["uid"] != payload.patient_id and user.get("role") != "doctor":
-        raise HTTPException(status_code=403, detail="Unauthorized submission")
-
-    data: Dict[str, Any] = payload.dict(exclude_none=True)
-
+def _build_ml_features(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Map a stored/submitted record to the ML feature dict (computes BMI if missing)."""
     vitals: Dict[str, Any] = data.get("vitals") or {}
 
     # Prefer root fields, fallback to vitals
@@ -59,57 +67,102 @@ async def submit_record(payload: HealthData = Body(...), user=Depends(get_curren
             bmi = None
 
     # Build ML features (MATCHES training column names)
+    return {
+        "Age": data.get("age"),
+        "Gender": data.get("gender"),
+        "Height_cm": height_cm,
+        "Weight_kg": weight_kg,
+        "BMI": bmi,
+        "Chronic_Disease": data.get("chronic_disease"),
+
+        "Blood_Pressure_Systolic": _first(data.get("blood_pressure_systolic"), vitals.get("blood_pressure_systolic")),
+        "Blood_Pressure_Diastolic": _first(data.get("blood_pressure_diastolic"), vitals.get("blood_pressure_diastolic")),
+        "Cholesterol_Level": _first(data.get("cholesterol_level"), vitals.get("cholesterol_level")),
+        "Blood_Sugar_Level": _first(data.get("blood_sugar_level"), vitals.get("blood_sugar_level")),
+
+        # These are bools in API model → strings for ML encoders
+        "Genetic_Risk_Factor": _bool_to_yesno(data.get("genetic_risk_factor")),
+        "Alcohol_Consumption": _bool_to_yesno(data.get("alcohol_consumption")),
+        "Smoking_Habit": _bool_to_yesno(data.get("smoking_habit")),
+
+        "Allergies": data.get("allergies"),
+        "Daily_Steps": data.get("daily_steps"),
+        "Exercise_Frequency": data.get("exercise_frequency"),
+        "Sleep_Hours": data.get("sleep_hours"),
+        "Dietary_Habits": data.get("dietary_habits"),
+        "Caloric_Intake": data.get("caloric_intake"),
+        "Protein_Intake": data.get("protein_intake"),
+        "Carbohydrate_Intake": data.get("carbohydrate_intake"),
+        "Fat_Intake": data.get("fat_intake"),
+        "Preferred_Cuisine": data.get("preferred_cuisine"),
+        "Food_Aversions": data.get("food_aversions"),
+    }
+
+
+@router.post("/", status_code=201)
+async def submit_record(
+    response: Response,
+    payload: HealthData = Body(...),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    user=Depends(get_current_user),
+):
+    if user["uid"] != payload.patient_id and user.get("role") != "doctor":
+        raise HTTPException(status_code=403, detail="Unauthorized submission")
+
+    data: Dict[str, Any] = payload.dict(exclude_none=True)
+
+    # Retries (same Idempotency-Key, or identical body shortly after) share
+    # one pipeline run and one stored record
+    key, ttl, digest = request_key(user["uid"], idempotency_key, data)
     try:
-        ml_features = {
-            "Age": data.get("age"),
-            "Gender": data.get("gender"),
-            "Height_cm": height_cm,
-            "Weight_kg": weight_kg,
-            "BMI": bmi,
-            "Chronic_Disease": data.get("chronic_disease"),
-
-            "Blood_Pressure_Systolic": _first(data.get("blood_pressure_systolic"), vitals.get("blood_pressure_systolic")),
-            "Blood_Pressure_Diastolic": _first(data.get("blood_pressure_diastolic"), vitals.get("blood_pressure_diastolic")),
-            "Cholesterol_Level": _first(data.get("cholesterol_level"), vitals.get("cholesterol_level")),
-            "Blood_Sugar_Level": _first(data.get("blood_sugar_level"), vitals.get("blood_sugar_level")),
-
-            # These are bools in API model → strings for ML encoders
-            "Genetic_Risk_Factor": _bool_to_yesno(data.get("genetic_risk_factor")),
-            "Alcohol_Consumption": _bool_to_yesno(data.get("alcohol_consumption")),
-            "Smoking_Habit": _bool_to_yesno(data.get("smoking_habit")),
-
-            "Allergies": data.get("allergies"),
-            "Daily_Steps": data.get("daily_steps"),
-            "Exercise_Frequency": data.get("exercise_frequency"),
-            "Sleep_Hours": data.get("sleep_hours"),
-            "Dietary_Habits": data.get("dietary_habits"),
-            "Caloric_Intake": data.get("caloric_intake"),
-            "Protein_Intake": data.get("protein_intake"),
-            "Carbohydrate_Intake": data.get("carbohydrate_intake"),
-            "Fat_Intake": data.get("fat_intake"),
-            "Preferred_Cuisine": data.get("preferred_cuisine"),
-            "Food_Aversions": data.get("food_aversions"),
-        }
-
-        suggested_plan = build_meal_plan(ml_features)
+        result, replayed = await idempotency_store.run(
+            key, ttl, lambda: _create_record(data, user["uid"]), digest
+        )
+    except IdempotencyKeyReused as e:
+        raise HTTPException(status_code=422, detail=str(e)) from e
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return result
 
+
+async def _create_record(data: Dict[str, Any], uid: str) -> Dict[str, Any]:
+    ml_features = _build_ml_features(data)
+
+    try:
+        # Off the event loop, so queued/other requests keep being served
+        suggested_plan = await run_in_threadpool(build_meal_plan, ml_features)
     except Exception as e:
         suggested_plan = {"error": "Meal plan generation failed", "details": str(e)}
 
     record = {
         **data,
-        "created_by": user["uid"],
+        "created_by": uid,
         "suggested_meal_plan": suggested_plan,
         "nutrition_approved": False,
         "timestamp": datetime.now(timezone.utc).isoformat(),
     }
 
-    doc_ref = firebase.db.collection("health_records").add(record)
-    return {"id": doc_ref[1].id, "suggested_meal_plan": suggested_plan}
+    # Record + daily vitals rollup in one atomic round trip
+    doc_ref = firebase.db.collection("health_records").document()
+    batch = firebase.db.batch()
+    batch.create(doc_ref, record)
+    vitals_service.add_rollup(
+        batch,
+        data["patient_id"],
+        record["timestamp"],
+        vitals_service.extract_vitals(
+            {**data, "bmi": ml_features["BMI"], "weight_kg": ml_features["Weight_kg"]}
+        ),
+    )
+    batch.commit()
+    health_service.record_created(doc_ref.id, record)
+
+    event_bus.publish_local("record.created", doc_ref.id, record)
+    return {"id": doc_ref.id, "suggested_meal_plan": suggested_plan}
 
 
 @router.get("/")
-async def list_records(user=Depends(get_current_user)):
+async def list_records(request: Request, user=Depends(get_current_user)):
     coll = firebase.db.collection("health_records")
 
     role = user.get("role") or user.get("roles")
@@ -118,14 +171,164 @@ async def list_records(user=Depends(get_current_user)):
     else:
         docs = coll.where("patient_id", "==", user["uid"]).stream()
 
-    return {"items": [{"id": d.id, **d.to_dict()} for d in docs]}
+    return document_list_response(request, docs)
+
+
+@router.get("/latest")
+async def latest_record(patient_id: Optional[str] = None, user=Depends(get_current_user)):
+    patient_id = patient_id or user["uid"]
+    if user["uid"] != patient_id and not has_role(user, "doctor"):
+        raise HTTPException(status_code=403, detail="Unauthorized")
+
+    record = health_service.get_latest_record(patient_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Record not found")
+    return record
+
+
+def _review_fields(user: dict, approve: bool) -> Dict[str, Any]:
+    """Fields written when a doctor approves or rejects a suggested plan."""
+    return {
+        "nutrition_approved": approve,
+        "review_status": "approved" if approve else "rejected",
+        "reviewed_by": user["uid"],
+        "reviewed_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+@router.post("/review")
+async def review_suggestions(
+    payload: BulkReviewRequest = Body(...),
+    user=Depends(require_role(["doctor"])),
+):
+    """Approve or reject many suggested plans at once.
+
+    Existence is checked with a single `get_all()` and updates are committed
+    in WriteBatch chunks of up to 500 writes, both in the threadpool so the
+    event loop (SSE streams, queued requests) is not blocked. Returns a
+    status per record: approved / rejected / not_found / failed.
+    """
+    record_ids = list(dict.fromkeys(payload.record_ids))  # dedupe, keep order
+    fields = _review_fields(user, payload.action == "approve")
+
+    coll = firebase.db.collection("health_records")
+    snapshots = await run_in_threadpool(
+        lambda: list(firebase.db.get_all(
+            [coll.document(rid) for rid in record_ids],
+            field_paths=["patient_id", "nutrition_approved"],
+        ))
+    )
+    found = {snap.id: snap.to_dict() or {} for snap in snapshots if snap.exists}
+
+    statuses: Dict[str, str] = {rid: "not_found" for rid in record_ids if rid not in found}
+    to_update = [rid for rid in record_ids if rid in found]
+
+    for start in range(0, len(to_update), BATCH_LIMIT):
+        chunk = to_update[start:start + BATCH_LIMIT]
+        batch = firebase.db.batch()
+        for rid in chunk:
+            batch.update(coll.document(rid), fields)
+        try:
+            await run_in_threadpool(batch.commit)
+        except Exception:
+            statuses.update({rid: "failed" for rid in chunk})
+            continue
+
+        # Back on the loop thread, where publish_local must be called
+        for rid in chunk:
+            statuses[rid] = fields["review_status"]
+            health_service.record_updated(rid, fields)
+            event_bus.publish_local("record.updated", rid, {**found[rid], **fields})
+
+    counts: Dict[str, int] = {}
+    for status in statuses.values():
+        counts[status] = counts.get(status, 0) + 1
+
+    return {
+        "results": [{"id": rid, "status": statuses[rid]} for rid in record_ids],
+        "counts": counts,
+    }
 
 
 @router.post("/{record_id}/approve")
 async def approve_suggestion(record_id: str, user=Depends(require_role(["doctor"]))):
-    ref = firebase.db.collection("health_records").document(record_id)
-    doc = ref.get()
-    if not doc.exists:
+    record = await run_in_threadpool(health_service.get_record, record_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Record not found")
+    fields = _review_fields(user, True)
+    if not await run_in_threadpool(health_service.update_record, record_id, fields):
         raise HTTPException(status_code=404, detail="Record not found")
-    ref.update({"nutrition_approved": True})
+    event_bus.publish_local("record.updated", record_id, {**record, **fields})
     return {"message": "Meal plan approved"}
+
+
+@router.post("/{record_id}/meal_plan")
+def generate_multi_day_plan(
+    record_id: str,
+    days: int = Query(7, ge=1, le=14),
+    user=Depends(get_current_user),
+):
+    """Generate an N-day plan for a record with a single LLM call.
+
+    Uses the record's stored nutrient targets and food shortlist. Each day
+    is saved to `meal_plan_days.day_<n>` as soon as it has been streamed,
+    so clients can show day 1 while later days are still generating.
+    (Plain `def`: runs in the threadpool while the LLM call streams.)
+    """
+    record = health_service.get_record(record_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Record not found")
+    if user["uid"] != record.get("patient_id") and not has_role(user, "doctor"):
+        raise HTTPException(status_code=403, detail="Unauthorized")
+
+    suggested = record.get("suggested_meal_plan") or {}
+    nutrients = suggested.get("nutrient_targets")
+    foods = suggested.get("food_options")
+    if not nutrients or not foods:
+        raise HTTPException(status_code=409, detail="Record has no nutrient targets")
+    if record.get("meal_plan_days_status") == "generating":
+        raise HTTPException(status_code=409, detail="Meal plan is already being generated")
+
+    if not health_service.update_record(
+        record_id, {"meal_plan_days": {}, "meal_plan_days_status": "generating"}
+    ):
+        raise HTTPException(status_code=404, detail="Record not found")
+
+    saved: List[Dict[str, Any]] = []
+
+    def _save_day(day: Dict[str, Any]) -> None:
+        # Keyed by stream position: the LLM's own "day" numbers may repeat or be missing
+        saved.append(day)
+        health_service.update_record(record_id, {f"meal_plan_days.day_{len(saved)}": day})
+
+    try:
+        result = build_multi_day_meal_plan(
+            _build_ml_features(record), nutrients, foods, days, on_day=_save_day
+        )
+    except TokenBudgetExceeded as e:
+        health_service.update_record(record_id, {"meal_plan_days_status": "failed"})
+        raise HTTPException(status_code=422, detail=str(e)) from e
+    except Exception as e:
+        health_service.update_record(record_id, {"meal_plan_days_status": "failed"})
+        raise HTTPException(status_code=502, detail="Meal plan generation failed") from e
+
+    received = result["usage"]["days_received"]
+    if received != days:
+        # Days already streamed stay saved; the status tells clients it is incomplete
+        health_service.update_record(
+            record_id,
+            {
+                "meal_plan_days_status": "partial" if received else "failed",
+                "meal_plan_days_usage": result["usage"],
+            },
+        )
+        raise HTTPException(
+            status_code=502,
+            detail=f"Meal plan generation returned {received} of {days} days",
+        )
+
+    health_service.update_record(
+        record_id,
+        {"meal_plan_days_status": "complete", "meal_plan_days_usage": result["usage"]},
+    )
+    return {"id": record_id, **result}
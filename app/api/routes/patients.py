@@ -11,15 +11,21 @@
     
 """Patient-related API routes."""
 
-from fastapi import APIRouter, Depends, Body, HTTPException
-from app.api.deps import get_current_user, require_role
+from datetime import date, timedelta
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Body, HTTPException, Query, Request
+from app.api.deps import get_current_user, require_role, has_role
 from app.core import firebase
+from app.core.responses import document_list_response
+from app.services import vitals_service
+from app.services.patient_service import patient_service
 
 router = APIRouter(prefix="/patients", tags=["patients"])
 
 
 @router.get("/")
-async def list_patients(user=Depends(get_current_user)):
+async def list_patients(request: Request, user=Depends(get_current_user)):
     """List patients.
 
     - If caller is a doctor/caregiver they can list all patients.
@@ -33,12 +39,7 @@ async def list_patients(user=Depends(get_current_user)):
     else:
         docs = coll.where("created_by", "==", user["uid"]).stream()
 
-    return {
-        "items": [
-            {"id": doc.id, **doc.to_dict()}
-            for doc in docs
-        ]
-    }
+    return document_list_response(request, docs)
 
 
 @router.post("/")
@@ -46,14 +47,75 @@ async def create_patient(
     data: dict = Body(...),
     user=Depends(get_current_user)
 ):
-    doc_ref = firebase.db.collection("patients").add({
+    patient_id = patient_service.create_patient({
         **data,
         "created_by": user["uid"]
     })
 
     return {
         "message": "Patient created successfully",
-        "id": doc_ref[1].id
+        "id": patient_id
+    }
+
+
+@router.get("/{patient_id}")
+async def get_patient(patient_id: str, user=Depends(get_current_user)):
+    patient = patient_service.get_patient(patient_id)
+    if patient is None:
+        raise HTTPException(status_code=404, detail="Patient not found")
+    if patient.get("created_by") != user["uid"] and not has_role(user, "doctor"):
+        raise HTTPException(status_code=403, detail="Unauthorized")
+    return {"id": patient_id, **patient}
+
+
+@router.get("/{patient_id}/vitals")
+async def get_vitals(
+    patient_id: str,
+    from_: Optional[date] = Query(None, alias="from"),
+    to: Optional[date] = Query(None),
+    resolution: str = Query("day"),
+    vital: Optional[List[str]] = Query(None),
+    max_points: int = Query(500, ge=3, le=5000),
+    user=Depends(get_current_user),
+):
+    """Vitals time series for charts.
+
+    - `resolution=day|week` reads the per-day rollup documents
+      (min / max / mean / count per vital).
+    - `resolution=raw` reads individual records (vitals fields only) and
+      downsamples each series to `max_points` with LTTB.
+    - Range defaults to the last 90 days.
+    """
+    if user["uid"] != patient_id and not has_role(user, "doctor"):
+        raise HTTPException(status_code=403, detail="Unauthorized")
+
+    if resolution not in vitals_service.RESOLUTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"resolution must be one of {list(vitals_service.RESOLUTIONS)}",
+        )
+
+    fields = vital or vitals_service.VITAL_FIELDS
+    unknown = [f for f in fields if f not in vitals_service.VITAL_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown vitals: {unknown}")
+
+    end = to or date.today()
+    start = from_ or end - timedelta(days=90)
+    if start > end:
+        raise HTTPException(status_code=400, detail="'from' must be before 'to'")
+
+    if resolution == "raw":
+        series = vitals_service.query_raw(patient_id, start, end, fields, max_points)
+    else:
+        series = vitals_service.query_rollups(patient_id, start, end, fields, resolution)
+
+    return {
+        "patient_id": patient_id,
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "resolution": resolution,
+        "series": series,
     }
 
 
@@ -0,0 +1,341 @@
+"""
+Admission control and priority load shedding.
+
+Expensive routes (record submission runs ML inference + an LLM call) are
+guarded so a burst of traffic degrades into fast 429/503 responses instead
+of everyone's latency collapsing:
+
+- token buckets: one global bucket and one per user; an empty bucket
+  returns 429 with `Retry-After`
+- route classes ("expensive", "approval", "default"), each with a max
+  number of in-flight requests and a bounded wait queue
+- priority: doctors and approval traffic are queued ahead of everyone else,
+  skip the global bucket, and may displace a lower-priority waiter when the
+  queue is full; a full queue or queue timeout returns 503 with `Retry-After`
+
+The middleware runs before route authentication, so it verifies the bearer
+token itself (off the event loop, with a small cache of verified tokens) to
+pick the bucket key and priority. Requests without a valid token are keyed
+by client IP, get normal priority and always count against the global
+bucket.
+
+A verified request whose Idempotency-Key is already in the idempotency
+store only waits on the stored result, so it skips the route-class queue
+(it is still rate limited).
+"""
+
+import asyncio
+import hashlib
+import heapq
+import itertools
+import math
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi.responses import JSONResponse
+from firebase_admin import auth
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.services.idempotency import header_key, idempotency_store
+
+HIGH_PRIORITY = 0
+NORMAL_PRIORITY = 1
+
+# (method, path regex, route class); first match wins, unmatched -> "default"
+ROUTE_CLASSES: List[Tuple[str, "re.Pattern", str]] = [
+    ("POST", re.compile(r"^/health_records/?$"), "expensive"),
+    ("POST", re.compile(r"^/health_records/[^/]+/meal_plan$"), "expensive"),
+    ("POST", re.compile(r"^/health_records/[^/]+/approve$"), "approval"),
+    ("POST", re.compile(r"^/health_records/review$"), "approval"),
+]
+
+# Long-lived or trivial endpoints that are never queued
+BYPASS_PATHS = re.compile(r"^/(events/|health$|$)")
+
+
+class Rejected(Exception):
+    def __init__(self, status_code: int, detail: str, retry_after: float):
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self) -> float:
+        """Consume a token; return 0 on success or seconds until one is available."""
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    @property
+    def idle(self) -> bool:
+        self._refill()
+        return self.tokens >= self.burst
+
+
+class RouteClass:
+    """Bounded concurrency + bounded priority queue for one class of routes."""
+
+    def __init__(self, name: str, max_in_flight: int, max_queue: int):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self._waiters: List[list] = []  # heap of [priority, seq, future]
+        self._seq = itertools.count()
+        self.avg_service_s = 1.0  # EWMA, used for Retry-After hints
+        self.stats: Dict[str, int] = {
+            "admitted": 0, "queued": 0, "rejected_queue_full": 0, "shed": 0, "timeouts": 0,
+        }
+
+    def retry_after(self) -> float:
+        backlog = len(self._waiters) + self.in_flight
+        return max(1.0, self.avg_service_s * backlog / self.max_in_flight)
+
+    async def acquire(self, priority: int, timeout: float) -> None:
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            self.stats["admitted"] += 1
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            worst = max(self._waiters)
+            if worst[0] <= priority:
+                self.stats["rejected_queue_full"] += 1
+                raise Rejected(503, "Server busy, please retry", self.retry_after())
+            # Shed the lowest-priority, most recent waiter to make room; it may
+            # already have timed out (cancelled) but not yet left the heap
+            self._remove(worst)
+            if not worst[2].done():
+                self.stats["shed"] += 1
+                worst[2].set_exception(Rejected(503, "Server busy, please retry", self.retry_after()))
+
+        entry = [priority, next(self._seq), asyncio.get_running_loop().create_future()]
+        heapq.heappush(self._waiters, entry)
+        self.stats["queued"] += 1
+        try:
+            # release() hands its slot over directly, so in_flight is already counted
+            await asyncio.wait_for(entry[2], timeout)
+        except asyncio.TimeoutError:
+            self._abandon(entry)
+            self.stats["timeouts"] += 1
+            raise Rejected(503, "Server busy, please retry", self.retry_after())
+        except asyncio.CancelledError:
+            self._abandon(entry)
+            raise
+        self.stats["admitted"] += 1
+
+    def release(self, service_s: float) -> None:
+        self.avg_service_s = 0.9 * self.avg_service_s + 0.1 * service_s
+        self._hand_off()
+
+    def _hand_off(self) -> None:
+        """Give a held slot to the next live waiter, or free it."""
+        while self._waiters:
+            _, _, fut = heapq.heappop(self._waiters)
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def _abandon(self, entry: list) -> None:
+        """Drop a waiter that gave up; pass its slot on if release() already granted one."""
+        self._remove(entry)
+        fut = entry[2]
+        if fut.done() and not fut.cancelled() and fut.exception() is None:
+            self._hand_off()
+
+    def _remove(self, entry: list) -> None:
+        try:
+            self._waiters.remove(entry)
+            heapq.heapify(self._waiters)
+        except ValueError:
+            pass
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queue_length": len(self._waiters),
+            "max_queue": self.max_queue,
+            "avg_service_s": round(self.avg_service_s, 3),
+            **self.stats,
+        }
+
+
+class AdmissionController:
+    MAX_TRACKED_USERS = 10000
+    MAX_CACHED_TOKENS = 10000
+    TOKEN_CACHE_SECONDS = 300.0
+
+    def __init__(self):
+        self.global_bucket = TokenBucket(settings.admission_global_rate, settings.admission_global_burst)
+        self.user_buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        # sha256(token) -> (expires, claims) for tokens that passed verification
+        self._tokens: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.classes: Dict[str, RouteClass] = {
+            "expensive": RouteClass(
+                "expensive",
+                settings.admission_expensive_concurrency,
+                settings.admission_expensive_queue,
+            ),
+            "approval": RouteClass(
+                "approval",
+                settings.admission_approval_concurrency,
+                settings.admission_approval_queue,
+            ),
+            "default": RouteClass(
+                "default",
+                settings.admission_default_concurrency,
+                settings.admission_default_queue,
+            ),
+        }
+        self.stats: Dict[str, int] = {
+            "rate_limited_user": 0, "rate_limited_global": 0, "unverified": 0,
+            "idempotent_bypass": 0,
+        }
+
+    def classify(self, method: str, path: str) -> Optional[str]:
+        if BYPASS_PATHS.match(path):
+            return None
+        for m, pattern, name in ROUTE_CLASSES:
+            if method == m and pattern.match(path):
+                return name
+        return "default"
+
+    async def verified_claims(self, headers: Dict[bytes, bytes]) -> Dict[str, Any]:
+        """Claims of a valid bearer token, or {} if there is none."""
+        auth_header = headers.get(b"authorization", b"").decode("latin-1")
+        if not auth_header.lower().startswith("bearer "):
+            return {}
+        token = auth_header[7:]
+        digest = hashlib.sha256(token.encode()).hexdigest()
+        now = time.time()
+
+        cached = self._tokens.get(digest)
+        if cached is not None and cached[0] > now:
+            self._tokens.move_to_end(digest)
+            return cached[1]
+
+        try:
+            claims = await run_in_threadpool(auth.verify_id_token, token)
+        except Exception:
+            return {}
+        expires = min(float(claims.get("exp", now)), now + self.TOKEN_CACHE_SECONDS)
+        self._tokens[digest] = (expires, claims)
+        self._tokens.move_to_end(digest)
+        while len(self._tokens) > self.MAX_CACHED_TOKENS:
+            self._tokens.popitem(last=False)
+        return claims
+
+    def check_rate(self, user_key: str, priority: int) -> None:
+        bucket = self.user_buckets.get(user_key)
+        if bucket is None:
+            # Keys are verified uids or client IPs; evict the least recently seen
+            while len(self.user_buckets) >= self.MAX_TRACKED_USERS:
+                self.user_buckets.popitem(last=False)
+            bucket = self.user_buckets[user_key] = TokenBucket(
+                settings.admission_user_rate, settings.admission_user_burst
+            )
+        else:
+            self.user_buckets.move_to_end(user_key)
+
+        wait = bucket.take()
+        if wait:
+            self.stats["rate_limited_user"] += 1
+            raise Rejected(429, "Too many requests", wait)
+
+        # High-priority traffic is not throttled by everyone else's load
+        if priority > HIGH_PRIORITY:
+            wait = self.global_bucket.take()
+            if wait:
+                self.stats["rate_limited_global"] += 1
+                raise Rejected(429, "Too many requests", wait)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.admission_enabled,
+            "global_tokens": round(self.global_bucket.tokens, 2),
+            "tracked_users": len(self.user_buckets),
+            **self.stats,
+            "classes": {name: rc.snapshot() for name, rc in self.classes.items()},
+        }
+
+
+class AdmissionMiddleware:
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.admission_enabled:
+            await self.app(scope, receive, send)
+            return
+
+        class_name = self.controller.classify(scope["method"], scope["path"])
+        if class_name is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        claims = await self.controller.verified_claims(headers)
+        user_key = claims.get("uid") or claims.get("user_id") or claims.get("sub")
+        if user_key:
+            role = claims.get("role") or claims.get("roles")
+            is_doctor = role == "doctor" or (isinstance(role, list) and "doctor" in role)
+            priority = HIGH_PRIORITY if is_doctor or class_name == "approval" else NORMAL_PRIORITY
+        else:
+            self.controller.stats["unverified"] += 1
+            client = scope.get("client")
+            user_key = f"ip:{client[0] if client else 'anonymous'}"
+            priority = NORMAL_PRIORITY
+
+        idempotency_key = headers.get(b"idempotency-key", b"").decode("latin-1")
+        duplicate = bool(claims and idempotency_key) and idempotency_store.has(
+            header_key(user_key, idempotency_key)
+        )
+
+        route_class = self.controller.classes[class_name]
+        try:
+            self.controller.check_rate(user_key, priority)
+            if duplicate:
+                self.controller.stats["idempotent_bypass"] += 1
+            else:
+                await route_class.acquire(priority, settings.admission_queue_timeout_seconds)
+        except Rejected as r:
+            response = JSONResponse(
+                {"detail": r.detail},
+                status_code=r.status_code,
+                headers={"Retry-After": str(math.ceil(r.retry_after))},
+            )
+            await response(scope, receive, send)
+            return
+
+        if duplicate:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            route_class.release(time.monotonic() - started)
+
+
+admission_controller = AdmissionController()
@@ -10,6 +10,48 @@ class Settings(BaseSettings):
     firebase_credentials: str | None = None  # Path to service account JSON
     firestore_emulator_host: str | None = None
 
+    # Server push (SSE)
+    event_source: str = "local"  # "local" (in-process) or "firestore" (on_snapshot)
+    event_queue_size: int = 100  # buffered events per connected client
+    event_keepalive_seconds: float = 15.0
+
+    # Responses
+    compression_min_size: int = 1024  # bytes; smaller bodies are sent as-is
+
+    # Document cache (per collection, per process)
+    cache_max_entries: int = 1024
+    cache_ttl_seconds: float = 30.0
+    cache_listen: bool = False  # invalidate via Firestore listeners (costs reads)
+
+    # Meal planning
+    meal_planner: str = "llm"  # "llm", "local" (optimizer only) or "auto"
+    meal_plan_llm_notes: bool = False  # add Gemini narrative to local plans
+    meal_plan_token_budget: int = 8000  # estimated prompt + output tokens per LLM call
+
+    # Admission control (see app/core/admission.py)
+    admission_enabled: bool = True
+    admission_global_rate: float = 50.0  # requests/second across all users
+    admission_global_burst: int = 100
+    admission_user_rate: float = 5.0  # requests/second per user
+    admission_user_burst: int = 20
+    admission_expensive_concurrency: int = 4  # ML + LLM routes
+    admission_expensive_queue: int = 16
+    admission_approval_concurrency: int = 16
+    admission_approval_queue: int = 64
+    admission_default_concurrency: int = 64
+    admission_default_queue: int = 256
+    admission_queue_timeout_seconds: float = 10.0
+
+    # Idempotent record submission
+    idempotency_ttl_seconds: float = 600.0  # requests with an Idempotency-Key header
+    idempotency_content_ttl_seconds: float = 60.0  # fallback: identical request body
+
+    # On-demand profiling (see app/core/profiling.py)
+    profiling_enabled: bool = False
+    profiling_sample_rate: float = 0.0  # fraction of requests profiled automatically
+    profiling_interval_ms: float = 5.0
+    profiling_ring_size: int = 50
+
     class Config:
         env_file = ".env"
 
@@ -0,0 +1,181 @@
+"""
+On-demand per-request profiling.
+
+When PROFILING_ENABLED=true, a request is profiled if either:
+- it carries `X-Profile: 1` and a bearer token of a doctor/admin, or
+- it is picked by random sampling (PROFILING_SAMPLE_RATE, 0.0 - 1.0)
+
+A background thread samples Python stacks at a fixed interval while the
+request runs, and the result is kept as collapsed stacks ("frame;frame;
+frame count" lines, flamegraph.pl / speedscope compatible) in a bounded
+in-memory ring. Only busy threads are recorded: the event loop thread
+unless it is idle in select(), and other threads only while they run code
+under app/ (threadpool routes, their Firestore calls). Idle workers and
+client-library threads are skipped. Concurrent requests still show up.
+
+Long-lived and trivial endpoints (admission's BYPASS_PATHS, e.g. the
+event stream) are never profiled. The X-Profile token check reuses
+admission's cached verification, and joining the sampler thread runs in
+the threadpool, so the event loop is not blocked.
+
+When disabled the middleware is not installed at all, so there is no
+per-request overhead.
+"""
+
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.admission import BYPASS_PATHS, admission_controller
+from app.core.config import settings
+
+PROFILE_HEADER = b"x-profile"
+PROFILER_ROLES = ("doctor", "admin")
+
+APP_ROOT = str(Path(__file__).resolve().parents[1])
+# (module, function) leaf frames of an event loop waiting for I/O
+IDLE_LEAVES = {("selectors", "select"), ("selectors", "poll")}
+
+
+class StackSampler:
+    """Collect collapsed stacks of busy threads until stopped."""
+
+    def __init__(self, interval_s: float, loop_thread_id: int):
+        self.interval_s = interval_s
+        self.loop_thread_id = loop_thread_id
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        while not self._stop.wait(self.interval_s):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                leaf = (Path(frame.f_code.co_filename).stem, frame.f_code.co_name)
+                frames: List[str] = []
+                in_app = False
+                while frame is not None:
+                    code = frame.f_code
+                    in_app = in_app or code.co_filename.startswith(APP_ROOT)
+                    frames.append(f"{Path(code.co_filename).stem}:{code.co_name}:{frame.f_lineno}")
+                    frame = frame.f_back
+                if thread_id == self.loop_thread_id:
+                    if leaf in IDLE_LEAVES:
+                        continue
+                elif not in_app:
+                    continue
+                if thread_id not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                root = names.get(thread_id, str(thread_id)).replace(";", "_")
+                self.stacks[";".join([root, *reversed(frames)])] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+
+class ProfileStore:
+    """Bounded ring of finished profiles."""
+
+    def __init__(self, size: int):
+        self._profiles: deque = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, profile: Dict[str, Any]) -> None:
+        with self._lock:
+            self._profiles.append(profile)
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {k: v for k, v in p.items() if k != "collapsed"}
+                for p in reversed(self._profiles)
+            ]
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return next((p for p in self._profiles if p["id"] == profile_id), None)
+
+
+async def _is_authorized(headers: Dict[bytes, bytes]) -> bool:
+    decoded = await admission_controller.verified_claims(headers)
+    role = decoded.get("role") or decoded.get("roles")
+    roles = role if isinstance(role, list) else [role]
+    return any(r in PROFILER_ROLES for r in roles)
+
+
+class ProfilingMiddleware:
+    def __init__(self, app, store: ProfileStore):
+        self.app = app
+        self.store = store
+        # One profile at a time: overlapping samplers would double-count
+        self._busy = threading.Lock()
+
+    async def _trigger(self, headers: Dict[bytes, bytes]) -> Optional[str]:
+        if headers.get(PROFILE_HEADER) in (b"1", b"true") and await _is_authorized(headers):
+            return "header"
+        if settings.profiling_sample_rate > 0 and random.random() < settings.profiling_sample_rate:
+            return "sampled"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or BYPASS_PATHS.match(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        trigger = await self._trigger(dict(scope["headers"]))
+        if trigger is None or not self._busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": None}
+
+        async def _send(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        sampler = StackSampler(settings.profiling_interval_ms / 1000, threading.get_ident())
+        started_at = datetime.now(timezone.utc).isoformat()
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            try:
+                await run_in_threadpool(sampler.stop)
+            finally:
+                self._busy.release()
+            self.store.add({
+                "id": uuid.uuid4().hex[:12],
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status["code"],
+                "trigger": trigger,
+                "started_at": started_at,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+                "samples": sampler.samples,
+                "collapsed": sampler.collapsed(),
+            })
+
+
+profile_store = ProfileStore(settings.profiling_ring_size)
@@ -0,0 +1,104 @@
+"""
+Response encoding helpers.
+
+- ORJSONResponse: fast JSON encoding (Firestore timestamps, numpy values)
+- document_list_response: list endpoint response with a strong ETag derived
+  from document IDs + update times; `If-None-Match` hits return 304 before
+  any document is converted or serialized
+- CompressionMiddleware: brotli (if `brotli-asgi` is installed) or gzip
+  above a size threshold; event streams are never compressed (decided by
+  path, since SSE clients don't always send `Accept: text/event-stream`)
+"""
+
+import hashlib
+from typing import Any, Iterable
+
+import orjson
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+from starlette.middleware.gzip import GZipMiddleware
+
+from app.core.admission import BYPASS_PATHS
+
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:  # optional dependency
+    BrotliMiddleware = None
+
+
+def _default(value: Any):
+    # Firestore DatetimeWithNanoseconds and other datetime subclasses
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+class ORJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content,
+            default=_default,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+        )
+
+
+# ------------------------------------------------------------------
+# ETags / conditional GET
+# ------------------------------------------------------------------
+def documents_etag(docs: Iterable) -> str:
+    """Strong ETag over (id, update_time) of Firestore document snapshots."""
+    h = hashlib.sha1()
+    for d in docs:
+        ts = d.update_time
+        stamp = ts.rfc3339() if hasattr(ts, "rfc3339") else str(ts)
+        h.update(f"{d.id}:{stamp};".encode())
+    return f'"{h.hexdigest()}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [c.strip() for c in header.split(",")]
+    # Weak comparison is correct for If-None-Match (RFC 9110 13.1.2)
+    return "*" in candidates or any(c.removeprefix("W/") == etag for c in candidates)
+
+
+def document_list_response(request: Request, docs: Iterable) -> Response:
+    """Return `{"items": [...]}` for snapshots, or 304 if the client is current."""
+    docs = list(docs)
+    etag = documents_etag(docs)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    return ORJSONResponse(
+        {"items": [{"id": d.id, **d.to_dict()} for d in docs]},
+        headers=headers,
+    )
+
+
+# ------------------------------------------------------------------
+# Compression
+# ------------------------------------------------------------------
+class CompressionMiddleware:
+    """Brotli/gzip compression that leaves Server-Sent Events untouched."""
+
+    def __init__(self, app, minimum_size: int = 1024):
+        self.app = app
+        if BrotliMiddleware is not None:
+            self.compressed = BrotliMiddleware(app, minimum_size=minimum_size, gzip_fallback=True)
+        else:
+            self.compressed = GZipMiddleware(app, minimum_size=minimum_size)
+
+    async def __call__(self, scope, receive, send):
+        # The compressors buffer small writes, which would hold SSE frames back
+        if scope["type"] == "http" and not BYPASS_PATHS.match(scope["path"]):
+            accept = dict(scope["headers"]).get(b"accept", b"")
+            if b"text/event-stream" not in accept:
+                await self.compressed(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
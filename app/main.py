@@ -1,10 +1,21 @@
+import asyncio
 from fastapi import FastAPI
+from app.core.admission import AdmissionMiddleware, admission_controller
+from app.core.config import settings
 from app.core.firebase import init_firebase
-from app.api.routes import auth, patients, caregivers, health_records
-from app.services import ml_inference
+from app.core.profiling import ProfilingMiddleware, profile_store
+from app.core.responses import ORJSONResponse, CompressionMiddleware
+from app.api.routes import auth, patients, caregivers, health_records, events, admin
+from app.services import cache
+from app.services import food_filter, ml_inference
+from app.services.events import event_bus
 from pathlib import Path
 
-app = FastAPI(title="Mobile Caregiving Backend")
+app = FastAPI(title="Mobile Caregiving Backend", default_response_class=ORJSONResponse)
+app.add_middleware(CompressionMiddleware, minimum_size=settings.compression_min_size)
+app.add_middleware(AdmissionMiddleware, controller=admission_controller)
+if settings.profiling_enabled:
+    app.add_middleware(ProfilingMiddleware, store=profile_store)
 
 
 @app.on_event("startup")
@@ -21,6 +32,22 @@ def startup():
         # Don't crash the whole app if models are missing; log and continue.
         print("Warning: ML models not loaded at startup; check ml/trained_models/")
 
+    # Parse (or load the binary snapshot of) the food database up front
+    food_filter.load_food_db()
+
+
+@app.on_event("startup")
+async def start_listeners():
+    """Bind the server-push event bus to the running loop and start Firestore listeners."""
+    event_bus.start(asyncio.get_running_loop())
+    cache.start_listeners()
+
+
+@app.on_event("shutdown")
+def stop_listeners():
+    event_bus.stop()
+    cache.stop_listeners()
+
 
 @app.get("/")
 async def root():
@@ -37,3 +64,5 @@ app.include_router(auth.router)
 app.include_router(patients.router)
 app.include_router(caregivers.router)
 app.include_router(health_records.router)
+app.include_router(events.router)
+app.include_router(admin.router)
@@ -0,0 +1,8 @@
+"""Pydantic models for doctor review of suggested meal plans."""
+from pydantic import BaseModel, Field
+from typing import List, Literal
+
+
+class BulkReviewRequest(BaseModel):
+    record_ids: List[str] = Field(..., min_items=1, max_items=2000)
+    action: Literal["approve", "reject"] = "approve"
@@ -0,0 +1,130 @@
+"""
+Process-local read-through document cache.
+
+Each Firestore collection gets its own bounded LRU + TTL cache with hit/miss
+counters. Entries are kept fresh by:
+- write-through from local mutations (services update the cache after a
+  successful write)
+- optionally a Firestore `on_snapshot` listener per collection that drops
+  entries changed by other workers (CACHE_LISTEN=true)
+
+The TTL bounds staleness when neither of the above sees a change.
+
+Derived lookups live in their own cache named "<collection>:<view>" (e.g.
+"health_records:latest", keyed by patient id) and are invalidated by the
+collection's listener.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app.core import firebase
+from app.core.config import settings
+
+
+class DocumentCache:
+    def __init__(self, name: str, max_entries: int = 1024, ttl_seconds: float = 30.0):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value or None (expired entries count as misses)."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            if self._data.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+# ------------------------------------------------------------------
+# Registry (one cache per collection)
+# ------------------------------------------------------------------
+_CACHES: Dict[str, DocumentCache] = {}
+_WATCHES: Dict[str, Any] = {}
+
+
+def get_cache(collection: str) -> DocumentCache:
+    cache = _CACHES.get(collection)
+    if cache is None:
+        cache = _CACHES[collection] = DocumentCache(
+            collection,
+            max_entries=settings.cache_max_entries,
+            ttl_seconds=settings.cache_ttl_seconds,
+        )
+    return cache
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: cache.stats() for name, cache in _CACHES.items()}
+
+
+def start_listeners() -> None:
+    """Invalidate cached documents changed anywhere (opt-in, costs reads)."""
+    if not settings.cache_listen or firebase.db is None:
+        return
+    for name, cache in list(_CACHES.items()):
+        # Derived caches ("<collection>:<view>") ride on their collection's listener
+        if ":" in name or name in _WATCHES:
+            continue
+
+        def _on_snapshot(col_snapshot, changes, read_time, cache=cache, name=name):
+            latest = _CACHES.get(f"{name}:latest")
+            for change in changes:
+                doc = change.document
+                cache.invalidate(doc.id)
+                # Per-patient lookups (e.g. latest record) are keyed by patient
+                patient_id = (doc.to_dict() or {}).get("patient_id")
+                if patient_id and latest is not None:
+                    latest.invalidate(patient_id)
+
+        _WATCHES[name] = firebase.db.collection(name).on_snapshot(_on_snapshot)
+
+
+def stop_listeners() -> None:
+    for watch in _WATCHES.values():
+        watch.unsubscribe()
+    _WATCHES.clear()
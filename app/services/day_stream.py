@@ -0,0 +1,87 @@
+"""
+Incremental parser for streamed multi-day meal plans.
+
+Kept free of the Gemini client so it can be used (and tested) without an
+API key.
+"""
+
+import json
+
+
+class DayStreamParser:
+    """
+    Incrementally parse the day objects of a streamed LLM reply.
+
+    Accepted shapes (text before the JSON, e.g. a code fence, is skipped):
+    - a bare array:            [{"day": 1, "meals": {...}}, ...]
+    - a wrapped array:         {"days": [{"day": 1, "meals": {...}}, ...]}
+    - a single day object:     {"day": 1, "meals": {...}}
+
+    Only objects in one of those positions are candidates, and a candidate
+    is returned only if it is a dict with a "meals" key; anything else is
+    dropped. Parsing stops once the first top-level JSON value is closed.
+    `feed()` returns every day completed by the new chunk, so callers can
+    persist day 1 while later days are still being generated.
+    """
+
+    def __init__(self):
+        self._buf = ""
+        self._pos = 0
+        self._stack = []  # open containers: [char, start offset, is_candidate]
+        self._in_string = False
+        self._escape = False
+        self.finished = False
+
+    def feed(self, chunk: str) -> list:
+        if self.finished:
+            return []
+        self._buf += chunk
+        done = []
+        while self._pos < len(self._buf) and not self.finished:
+            ch = self._buf[self._pos]
+            if not self._stack:
+                # Outside JSON: skip preamble text until a value starts
+                if ch in "[{":
+                    self._stack.append([ch, self._pos, ch == "{"])
+            elif self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "[{":
+                self._stack.append([ch, self._pos, ch == "{" and self._is_day_slot()])
+            elif ch in "]}":
+                _, start, is_candidate = self._stack.pop()
+                if is_candidate:
+                    day = self._load(self._buf[start:self._pos + 1])
+                    if day is not None:
+                        done.append(day)
+                if not self._stack:
+                    self.finished = True
+            self._pos += 1
+
+        # Drop consumed text that is not part of an open candidate object
+        open_starts = [start for _, start, is_candidate in self._stack if is_candidate]
+        keep_from = min(open_starts) if open_starts else self._pos
+        self._buf = self._buf[keep_from:]
+        self._pos -= keep_from
+        for entry in self._stack:
+            entry[1] -= keep_from
+        return done
+
+    def _is_day_slot(self) -> bool:
+        """True if an object opened now sits where a day object belongs."""
+        kinds = [entry[0] for entry in self._stack]
+        return kinds == ["["] or kinds == ["{", "["]
+
+    @staticmethod
+    def _load(text: str):
+        try:
+            obj = json.loads(text)
+        except ValueError:
+            return None
+        return obj if isinstance(obj, dict) and "meals" in obj else None
@@ -0,0 +1,168 @@
+"""
+In-process change event bus for server push.
+
+Clients subscribe (via the SSE route) and receive small change events for
+the health records they are allowed to see:
+- doctors receive every event (optionally narrowed to some patient IDs)
+- patients receive only events for their own patient_id
+
+Events are produced either by:
+- the API routes themselves ("local" mode, default, good for a single worker)
+- a Firestore `on_snapshot` listener ("firestore" mode, every worker sees
+  every change no matter which worker handled the write)
+
+Each subscriber is just a bounded asyncio.Queue, so idle connections cost a
+few hundred bytes and fan-out only touches the subscribers indexed under the
+event's patient_id plus the "see everything" subscribers.
+"""
+
+import asyncio
+import json
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional, Set
+
+from app.core import firebase
+from app.core.config import settings
+
+
+class Subscription:
+    """A single connected client."""
+
+    def __init__(self, patient_ids: Optional[Set[str]], max_queue: int):
+        # None -> receives every event (doctor without filter)
+        self.patient_ids = patient_ids
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.dropped = 0
+
+    def offer(self, message: str) -> None:
+        """Enqueue without blocking; drop the oldest event for slow clients."""
+        if self.queue.full():
+            try:
+                self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+            self.dropped += 1
+        self.queue.put_nowait(message)
+
+
+class EventBus:
+    def __init__(self, max_queue: int = 100):
+        self.max_queue = max_queue
+        self._all: Set[Subscription] = set()
+        self._by_patient: Dict[str, Set[Subscription]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._watch = None
+        self._initial_snapshot_seen = False
+
+    # --------------------------------------------------
+    # Subscriptions
+    # --------------------------------------------------
+    def subscribe(self, patient_ids: Optional[Iterable[str]] = None) -> Subscription:
+        """Register a subscriber. `patient_ids=None` means all patients."""
+        self._loop = asyncio.get_running_loop()
+        ids = set(patient_ids) if patient_ids is not None else None
+        sub = Subscription(ids, self.max_queue)
+
+        if ids is None:
+            self._all.add(sub)
+        else:
+            for pid in ids:
+                self._by_patient.setdefault(pid, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        if sub.patient_ids is None:
+            self._all.discard(sub)
+            return
+        for pid in sub.patient_ids:
+            subs = self._by_patient.get(pid)
+            if subs is None:
+                continue
+            subs.discard(sub)
+            if not subs:
+                del self._by_patient[pid]
+
+    # --------------------------------------------------
+    # Publishing
+    # --------------------------------------------------
+    def publish(self, event: Dict[str, Any]) -> None:
+        """Fan an event out to matching subscribers (event loop thread only)."""
+        # Encode once as an SSE frame; every subscriber gets the same string
+        message = f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+        targets = set(self._all)
+        patient_id = event.get("patient_id")
+        if patient_id is not None:
+            targets.update(self._by_patient.get(patient_id, ()))
+        for sub in targets:
+            sub.offer(message)
+
+    def publish_threadsafe(self, event: Dict[str, Any]) -> None:
+        """Publish from a non-loop thread (e.g. Firestore listener callbacks)."""
+        if self._loop is None or self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self.publish, event)
+
+    def publish_local(self, event_type: str, record_id: str, data: Dict[str, Any]) -> None:
+        """
+        Publish a change made by this process.
+
+        No-op when the Firestore listener is running, since it will report
+        the same change (and changes from other workers) on its own.
+        """
+        if self._watch is not None:
+            return
+        self.publish(make_event(event_type, record_id, data))
+
+    # --------------------------------------------------
+    # Firestore listener
+    # --------------------------------------------------
+    def start(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Bind to the app's event loop and start the listener if configured."""
+        self._loop = loop
+        if settings.event_source != "firestore" or self._watch is not None:
+            return
+        if firebase.db is None:
+            print("[WARN] Firestore not initialized; falling back to local events")
+            return
+        self._initial_snapshot_seen = False
+        self._watch = firebase.db.collection("health_records").on_snapshot(self._on_snapshot)
+        print("[INFO] Listening to health_records changes for server push")
+
+    def stop(self) -> None:
+        if self._watch is not None:
+            self._watch.unsubscribe()
+            self._watch = None
+
+    def _on_snapshot(self, col_snapshot, changes, read_time) -> None:
+        # The first callback replays the whole collection as ADDED; skip it.
+        if not self._initial_snapshot_seen:
+            self._initial_snapshot_seen = True
+            return
+
+        for change in changes:
+            event_type = _CHANGE_TYPES.get(change.type.name)
+            if event_type is None:
+                continue
+            doc = change.document
+            self.publish_threadsafe(make_event(event_type, doc.id, doc.to_dict() or {}))
+
+
+_CHANGE_TYPES = {
+    "ADDED": "record.created",
+    "MODIFIED": "record.updated",
+    "REMOVED": "record.deleted",
+}
+
+
+def make_event(event_type: str, record_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    """Build a compact change event (clients re-fetch details if needed)."""
+    return {
+        "type": event_type,
+        "record_id": record_id,
+        "patient_id": data.get("patient_id"),
+        "nutrition_approved": data.get("nutrition_approved"),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+event_bus = EventBus(max_queue=settings.event_queue_size)
@@ -1,3 +1,7 @@
+import hashlib
+import os
+import tempfile
+import numpy as np
 import pandas as pd
 import re
 from functools import lru_cache
@@ -5,15 +9,13 @@ from pathlib import Path
 
 FOOD_DB_PATH = Path(__file__).resolve().parents[1] / "data" / "food_database_final.csv"
 
+# Parsed binary copy of the CSV, rebuilt whenever the CSV changes
+FOOD_DB_SNAPSHOT_PATH = FOOD_DB_PATH.with_suffix(".npz")
 
-# ---------------- Helpers ---------------- #
+NUMERIC_COLUMNS = ["Calories (kcal)", "Protein (g)", "Carbohydrate (g)", "Fat (g)"]
 
-def clean_number(value):
-    if pd.isna(value):
-        return 0.0
-    match = re.findall(r"[\d\.]+", str(value))
-    return float(match[0]) if match else 0.0
 
+# ---------------- Helpers ---------------- #
 
 def parse_list(text: str):
     if not text:
@@ -24,17 +26,104 @@ def parse_list(text: str):
 
 # ---------------- Load DB ---------------- #
 
-@lru_cache(maxsize=1)
-def load_food_db() -> pd.DataFrame:
+def parse_numeric(series: pd.Series) -> pd.Series:
+    """"110 kcal" -> 110.0, missing/invalid -> 0.0 (always float64)."""
+    extracted = series.astype(str).str.extract(r"([\d\.]+)", expand=False)
+    return pd.to_numeric(extracted, errors="coerce").fillna(0.0).astype(float)
+
+
+def _source_fingerprint() -> dict:
+    stat = FOOD_DB_PATH.stat()
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+
+def _source_sha256() -> str:
+    return hashlib.sha256(FOOD_DB_PATH.read_bytes()).hexdigest()
+
+
+def _parse_csv() -> pd.DataFrame:
     df = pd.read_csv(FOOD_DB_PATH)
 
-    for col in ["Calories (kcal)", "Protein (g)", "Carbohydrate (g)", "Fat (g)"]:
+    for col in NUMERIC_COLUMNS:
         if col in df.columns:
-            df[col] = df[col].apply(clean_number)
+            df[col] = parse_numeric(df[col])
 
     return df.fillna(0)
 
 
+def _write_snapshot(df: pd.DataFrame, sha256: str) -> None:
+    """Save columns as plain numpy arrays (no pickle) plus source metadata."""
+    fp = _source_fingerprint()
+    arrays = {}
+    for i, col in enumerate(df.columns):
+        if col in NUMERIC_COLUMNS:
+            arrays[f"col_{i}"] = df[col].to_numpy(dtype=float)
+        else:
+            arrays[f"col_{i}"] = df[col].astype(str).to_numpy(dtype=str)
+    tmp = None
+    try:
+        # Each worker writes its own temp file; os.replace then swaps in one
+        # complete snapshot (last writer wins, readers never see a partial file)
+        with tempfile.NamedTemporaryFile(
+            dir=FOOD_DB_SNAPSHOT_PATH.parent, suffix=".tmp.npz", delete=False
+        ) as f:
+            tmp = f.name
+            np.savez(
+                f,
+                __columns__=np.array(df.columns, dtype=str),
+                __source__=np.array([fp["mtime_ns"], fp["size"]], dtype=np.int64),
+                __sha256__=np.array(sha256),
+                **arrays,
+            )
+        os.replace(tmp, FOOD_DB_SNAPSHOT_PATH)
+    except OSError as exc:
+        if tmp is not None and os.path.exists(tmp):
+            os.remove(tmp)
+        # Read-only deployments just parse the CSV every time
+        print(f"[WARN] Could not write food DB snapshot: {exc}")
+
+
+def _read_snapshot():
+    """Return (DataFrame, is_fresh) or (None, False) if missing/unreadable."""
+    if not FOOD_DB_SNAPSHOT_PATH.exists():
+        return None, False
+    try:
+        with np.load(FOOD_DB_SNAPSHOT_PATH, allow_pickle=False) as snap:
+            columns = snap["__columns__"].tolist()
+            df = pd.DataFrame({c: snap[f"col_{i}"] for i, c in enumerate(columns)})
+            source = snap["__source__"].tolist()
+            sha256 = str(snap["__sha256__"])
+    except Exception:
+        return None, False
+
+    fp = _source_fingerprint()
+    if source == [fp["mtime_ns"], fp["size"]]:
+        return df, True
+    # mtime changed (e.g. fresh checkout) but content may be identical
+    if sha256 == _source_sha256():
+        _write_snapshot(df, sha256)
+        return df, True
+    return None, False
+
+
+@lru_cache(maxsize=1)
+def load_food_db() -> pd.DataFrame:
+    """
+    Food table with numeric macro columns.
+
+    Loads the binary snapshot when it matches the CSV (by mtime + size, or
+    content hash), otherwise parses the CSV and refreshes the snapshot.
+    Called at startup so workers never parse on the first request.
+    """
+    df, fresh = _read_snapshot()
+    if fresh:
+        return df
+
+    df = _parse_csv()
+    _write_snapshot(df, _source_sha256())
+    return df
+
+
 # ---------------- Main API ---------------- #
 
 def get_food_recommendations(patient: dict, targets: dict, max_items=20):
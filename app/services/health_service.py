@@ -1,13 +1,99 @@
 """Health-related business logic.
 
 Contains helpers to store and query health records in Firestore.
+Single-record reads go through the process-local document cache
+(see app.services.cache); local writes update the cache in place.
 """
+from typing import Any, Dict, List, Optional
+
+from google.api_core.exceptions import NotFound
+
+from app.core import firebase
 from app.models.health_data import HealthData
+from app.services.cache import get_cache
+
+COLLECTION = "health_records"
 
 
 class HealthService:
     def __init__(self):
-        pass
+        self.cache = get_cache(COLLECTION)
+        # patient_id -> id of the patient's latest record (kept apart from
+        # record ids so a crafted record id can never hit a pointer)
+        self.latest = get_cache(f"{COLLECTION}:latest")
+
+    def _collection(self):
+        return firebase.db.collection(COLLECTION)
+
+    def list_records(self, patient_id: str) -> List[Dict[str, Any]]:
+        docs = self._collection().where("patient_id", "==", patient_id).stream()
+        return [{"id": d.id, **d.to_dict()} for d in docs]
+
+    def get_record(self, record_id: str) -> Optional[Dict[str, Any]]:
+        """Return the record dict (treat as read-only) or None if missing."""
+        record = self.cache.get(record_id)
+        if record is not None:
+            return record
+
+        doc = self._collection().document(record_id).get()
+        if not doc.exists:
+            return None
+        record = doc.to_dict()
+        self.cache.set(record_id, record)
+        return record
+
+    def get_latest_record(self, patient_id: str) -> Optional[Dict[str, Any]]:
+        record_id = self.latest.get(patient_id)
+        if record_id is not None:
+            record = self.get_record(record_id)
+            if record is not None:
+                return {"id": record_id, **record}
+
+        docs = list(
+            self._collection()
+            .where("patient_id", "==", patient_id)
+            .order_by("timestamp", direction="DESCENDING")
+            .limit(1)
+            .stream()
+        )
+        if not docs:
+            return None
+        doc = docs[0]
+        self.cache.set(doc.id, doc.to_dict())
+        self.latest.set(patient_id, doc.id)
+        return {"id": doc.id, **doc.to_dict()}
+
+    def update_record(self, record_id: str, fields: Dict[str, Any]) -> bool:
+        """
+        Update fields and write the change through to the cache.
+
+        Returns False if the record no longer exists (e.g. deleted by another
+        worker while a stale copy was still cached).
+        """
+        try:
+            self._collection().document(record_id).update(fields)
+        except NotFound:
+            self.cache.invalidate(record_id)
+            return False
+        self.record_updated(record_id, fields)
+        return True
+
+    # --------------------------------------------------
+    # Write-through hooks for writes made outside this class (e.g. batches)
+    # --------------------------------------------------
+    def record_created(self, record_id: str, record: Dict[str, Any]) -> None:
+        self.cache.set(record_id, record)
+        if record.get("patient_id"):
+            self.latest.set(record["patient_id"], record_id)
+
+    def record_updated(self, record_id: str, fields: Dict[str, Any]) -> None:
+        if any("." in key for key in fields):
+            # Nested field paths: simpler to re-read than to merge locally
+            self.cache.invalidate(record_id)
+            return
+        cached = self.cache.get(record_id)
+        if cached is not None:
+            self.cache.set(record_id, {**cached, **fields})
+
 
-    def list_records(self, patient_id: str):
-        return []
+health_service = HealthService()
@@ -0,0 +1,122 @@
+"""
+Short-TTL idempotency store for expensive POSTs.
+
+Mobile clients retry `POST /health_records/` after timeouts. Requests with
+the same key share one execution:
+- a duplicate arriving while the first request is still running awaits the
+  same in-flight future
+- a duplicate arriving after it finished gets the stored response replayed
+- if the first execution fails, the key is dropped so a retry runs again
+- reusing a key with a different body raises IdempotencyKeyReused (422)
+
+AdmissionMiddleware lets requests whose Idempotency-Key is already in the
+store skip the route-class queue, since they only wait on the stored
+future. Body-hash duplicates (no header) can't be recognised before the
+body is read, so they still take an admission slot while they wait.
+
+The store is process-local; with several workers a retry routed to another
+worker is not deduplicated.
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from app.core.config import settings
+
+
+class IdempotencyKeyReused(Exception):
+    """An Idempotency-Key was sent again with a different request body."""
+
+
+class IdempotencyStore:
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        # key -> (expires, body digest, future)
+        self._entries: "OrderedDict[str, Tuple[float, str, asyncio.Future]]" = OrderedDict()
+        self.stats: Dict[str, int] = {"executed": 0, "replayed": 0, "joined": 0, "mismatched": 0}
+
+    def _purge(self) -> None:
+        now = time.monotonic()
+        while self._entries:
+            key, (expires, _, fut) = next(iter(self._entries.items()))
+            over = len(self._entries) > self.max_entries
+            if not fut.done() or (expires > now and not over):
+                break
+            del self._entries[key]
+
+    def has(self, key: str) -> bool:
+        """True if `key` has a live (in-flight or unexpired) entry."""
+        entry = self._entries.get(key)
+        return entry is not None and entry[0] > time.monotonic()
+
+    async def run(
+        self,
+        key: str,
+        ttl_seconds: float,
+        fn: Callable[[], Awaitable[Any]],
+        digest: str = "",
+    ) -> Tuple[Any, bool]:
+        """
+        Run `fn` once per key within `ttl_seconds`.
+
+        `digest` identifies the request body; a live key with a different
+        digest raises IdempotencyKeyReused instead of replaying.
+
+        Returns:
+            (result, replayed) where replayed is True for duplicates.
+        """
+        self._purge()
+
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            if entry[1] != digest:
+                self.stats["mismatched"] += 1
+                raise IdempotencyKeyReused("Idempotency-Key was already used with a different body")
+            fut = entry[2]
+            self.stats["joined" if not fut.done() else "replayed"] += 1
+            return await asyncio.shield(fut), True
+
+        fut = asyncio.get_running_loop().create_future()
+        self._entries[key] = (time.monotonic() + ttl_seconds, digest, fut)
+        self._entries.move_to_end(key)
+        self.stats["executed"] += 1
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            self._entries.pop(key, None)
+            fut.cancel()
+            raise
+        except Exception as exc:
+            self._entries.pop(key, None)
+            fut.set_exception(exc)
+            fut.exception()  # waiters re-raise it; don't warn if there are none
+            raise
+        fut.set_result(result)
+        return result, False
+
+
+def header_key(uid: str, idempotency_key: str) -> str:
+    return f"{uid}:key:{idempotency_key}"
+
+
+def request_key(
+    uid: str, idempotency_key: Optional[str], body: Dict[str, Any]
+) -> Tuple[str, float, str]:
+    """
+    Key + TTL + body digest for a request: the client's Idempotency-Key if
+    sent, otherwise the body digest itself (with a shorter TTL, since an
+    identical body is only very likely, not certainly, a retry).
+    """
+    digest = hashlib.sha256(
+        json.dumps(body, sort_keys=True, separators=(",", ":"), default=str).encode()
+    ).hexdigest()
+    if idempotency_key:
+        return header_key(uid, idempotency_key), settings.idempotency_ttl_seconds, digest
+    return f"{uid}:body:{digest}", settings.idempotency_content_ttl_seconds, digest
+
+
+idempotency_store = IdempotencyStore()
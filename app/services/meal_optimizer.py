@@ -0,0 +1,153 @@
+"""
+Deterministic local meal-plan optimizer.
+
+Fast alternative to the Gemini planner: picks foods from the
+`get_food_recommendations` shortlist and a portion multiplier for each,
+meal by meal, so the day's calories / protein / carbs / fats land close to
+the predicted nutrient targets.
+
+Per meal it runs a vectorized greedy search over every (food, multiplier)
+pair: each step adds the pair that most reduces the weighted squared
+relative error against the meal's share of the daily targets, and stops
+when nothing improves it. With ~20 candidates this takes well under a
+millisecond per meal.
+
+The plan matches the schema of `meal_planner_llm.generate_meal_plan`:
+
+    {"day": 1, "meals": {"breakfast": [{"food_name", "portion", "notes"}], ...}}
+"""
+
+import re
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from app.services.food_filter import parse_list
+
+MACRO_COLUMNS = ["Calories (kcal)", "Protein (g)", "Carbohydrate (g)", "Fat (g)"]
+TARGET_KEYS = ["Recommended_Calories", "Recommended_Protein", "Recommended_Carbs", "Recommended_Fats"]
+
+# Share of the daily targets per meal, and max distinct foods per meal
+MEAL_SHARES = {"breakfast": 0.25, "lunch": 0.35, "dinner": 0.30, "snacks": 0.10}
+MAX_ITEMS = {"breakfast": 2, "lunch": 3, "dinner": 3, "snacks": 1}
+
+PORTIONS = np.array([0.5, 0.75, 1.0, 1.25, 1.5, 2.0])
+
+# Relative importance of calories, protein, carbs, fats
+WEIGHTS = np.array([1.0, 0.6, 0.3, 0.3])
+
+# Relative tolerance per macro used to report whether the day is on target
+TOLERANCES = np.array([0.10, 0.15, 0.20, 0.20])
+
+
+def _excluded_terms(patient: dict) -> List[str]:
+    allergies = patient.get("Allergies") or patient.get("allergies")
+    aversions = patient.get("Food_Aversions") or patient.get("food_aversions")
+    return parse_list(allergies) + parse_list(aversions)
+
+
+def _portion_text(quantity, multiplier: float) -> str:
+    """Scale a quantity like '80g' or '200ml' by the chosen multiplier."""
+    text = str(quantity or "").strip()
+    match = re.match(r"^([\d\.]+)(\s*\S*)", text)
+    if not match:
+        return f"{multiplier:g} serving"
+    return f"{float(match.group(1)) * multiplier:g}{match.group(2)}"
+
+
+def _fill_meal(
+    macros: np.ndarray,
+    target: np.ndarray,
+    scale: np.ndarray,
+    available: np.ndarray,
+    max_items: int,
+) -> List[tuple]:
+    """Greedy (food, multiplier) selection for one meal."""
+    # options[i, j] = macros of food i at portion j -> shape (n, p, 4)
+    options = macros[:, None, :] * PORTIONS[None, :, None]
+
+    def error(total: np.ndarray) -> np.ndarray:
+        return (((total - target) / scale) ** 2 * WEIGHTS).sum(axis=-1)
+
+    picked: List[tuple] = []
+    total = np.zeros(4)
+    best_err = error(total)
+    usable = available.copy()
+
+    for _ in range(max_items):
+        if not usable.any():
+            break
+        errs = error(total + options)
+        errs[~usable] = np.inf
+        i, j = np.unravel_index(np.argmin(errs), errs.shape)
+        if errs[i, j] >= best_err:
+            break
+        picked.append((int(i), float(PORTIONS[j])))
+        total = total + options[i, j]
+        best_err = errs[i, j]
+        usable[i] = False
+
+    return picked
+
+
+def optimize_meal_plan(nutrients: dict, foods: list, patient: dict) -> Tuple[dict, Dict[str, float]]:
+    """
+    Build a 1-day plan from `foods` that approximates `nutrients`.
+
+    Returns:
+        (plan, totals) where totals uses the Recommended_* keys.
+    """
+    excluded = _excluded_terms(patient)
+    candidates = [
+        f for f in foods
+        if not any(term in str(f.get("Food", "")).lower() for term in excluded)
+    ]
+
+    meals: Dict[str, list] = {name: [] for name in MEAL_SHARES}
+    day_total = np.zeros(4)
+
+    if candidates:
+        macros = np.array(
+            [[float(f.get(col) or 0.0) for col in MACRO_COLUMNS] for f in candidates]
+        )
+        daily = np.array([float(nutrients.get(k) or 0.0) for k in TARGET_KEYS])
+        daily_scale = np.where(daily > 0, daily, 1.0)
+
+        # Prefer variety: a food is used once per day while alternatives remain
+        unused = np.ones(len(candidates), dtype=bool)
+
+        remaining_share = 1.0
+        for meal, share in MEAL_SHARES.items():
+            # Aim at this meal's share of what is still missing for the day,
+            # so earlier over/undershoots are corrected by later meals
+            target = np.clip(daily - day_total, 0.0, None) * (share / remaining_share)
+            remaining_share -= share
+            # Errors are relative to the meal's share of the *daily* targets,
+            # so a macro that is already met (target 0) is not over-penalised
+            scale = daily_scale * share
+
+            available = unused if unused.any() else np.ones_like(unused)
+            for i, mult in _fill_meal(macros, target, scale, available, MAX_ITEMS[meal]):
+                unused[i] = False
+                item = macros[i] * mult
+                day_total += item
+                food = candidates[i]
+                meals[meal].append({
+                    "food_name": food.get("Food"),
+                    "portion": _portion_text(food.get("Quantity"), mult),
+                    "notes": (
+                        f"{item[0]:.0f} kcal, {item[1]:.1f}g protein, "
+                        f"{item[2]:.1f}g carbs, {item[3]:.1f}g fat"
+                    ),
+                })
+
+    totals = dict(zip(TARGET_KEYS, np.round(day_total, 1).tolist()))
+    return {"day": 1, "meals": meals}, totals
+
+
+def within_tolerance(totals: Dict[str, float], nutrients: dict) -> bool:
+    """True if every macro total is within TOLERANCES of its target."""
+    got = np.array([totals[k] for k in TARGET_KEYS])
+    want = np.array([float(nutrients.get(k) or 0.0) for k in TARGET_KEYS])
+    scale = np.where(want > 0, want, 1.0)
+    return bool((np.abs(got - want) / scale <= TOLERANCES).all())
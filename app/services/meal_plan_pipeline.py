@@ -1,15 +1,64 @@
+from app.core.config import settings
 from app.services import ml_inference
 from app.services.food_filter import get_food_recommendations
-from app.services.meal_planner_llm import generate_meal_plan
+from app.services.meal_optimizer import optimize_meal_plan, within_tolerance
+
+
+class TokenBudgetExceeded(Exception):
+    """The LLM request would not fit MEAL_PLAN_TOKEN_BUDGET."""
+
+
+def _plan_meals(nutrients: dict, foods: list, patient: dict) -> dict:
+    """
+    Choose the meal planner according to `settings.meal_planner`:
+    - "llm":   Gemini plans every day (slow, narrative)
+    - "local": deterministic optimizer only (milliseconds)
+    - "auto":  optimizer first, Gemini only if the local plan misses targets
+
+    Local plans carry `on_target`, so a reviewer can see when the shortlist
+    could not reach the targets (always True in "auto" mode).
+    """
+    mode = settings.meal_planner
+
+    if mode in ("local", "auto"):
+        plan, totals = optimize_meal_plan(nutrients, foods, patient)
+        on_target = within_tolerance(totals, nutrients)
+        if mode == "local" or on_target:
+            plan["planner"] = "local"
+            plan["totals"] = totals
+            plan["on_target"] = on_target
+            if settings.meal_plan_llm_notes:
+                # Imported lazily: the LLM module needs a Gemini API key
+                from app.services.meal_planner_llm import describe_meal_plan
+
+                plan["notes"] = describe_meal_plan(plan, nutrients, patient)
+            return plan
+
+    from app.services.meal_planner_llm import generate_meal_plan
+
+    return generate_meal_plan(nutrients, foods, patient)
 
 
 def build_meal_plan(patient: dict) -> dict:
     nutrients = ml_inference.predict_nutrition(patient)
     foods = get_food_recommendations(patient, nutrients)
-    meal_plan = generate_meal_plan(nutrients, foods, patient)
+    meal_plan = _plan_meals(nutrients, foods, patient)
 
     return {
         "nutrient_targets": nutrients,
         "food_options": foods,
         "meal_plan": meal_plan
     }
+
+
+def build_multi_day_meal_plan(
+    patient: dict, nutrients: dict, foods: list, days: int, on_day=None
+) -> dict:
+    """N-day plan in one Gemini call (see meal_planner_llm.generate_meal_plans)."""
+    from app.services.meal_planner_llm import generate_meal_plans
+
+    return generate_meal_plans(
+        nutrients, foods, patient, days,
+        token_budget=settings.meal_plan_token_budget,
+        on_day=on_day,
+    )
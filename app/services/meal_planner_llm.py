@@ -1,11 +1,15 @@
 # app/services/meal_planner_llm.py
 import os
 import json
+import time
 from pathlib import Path
 
 from dotenv import load_dotenv
 import google.generativeai as genai
 
+from app.services.day_stream import DayStreamParser
+from app.services.meal_plan_pipeline import TokenBudgetExceeded
+
 
 # Load .env from project root reliably (Windows friendly)
 # project_root = .../mobile-caregiving-backend
@@ -75,3 +79,152 @@ Return STRICT JSON ONLY:
         return json.loads(text)
     except Exception:
         return {"error": "Invalid LLM output", "raw": text}
+
+
+def describe_meal_plan(plan: dict, nutrients: dict, patient: dict) -> str:
+    """Short narrative notes for a plan built by the local optimizer."""
+    meals_text = "\n".join(
+        f"- {meal}: " + ", ".join(f"{i['food_name']} ({i['portion']})" for i in items)
+        for meal, items in plan.get("meals", {}).items()
+    )
+
+    prompt = f"""
+You are a senior clinical dietician. In at most 4 sentences, explain this
+1-day meal plan to an elderly user ({patient.get("Age")} years,
+{patient.get("Chronic_Disease")}, {patient.get("Dietary_Habits")}).
+Targets: {nutrients.get("Recommended_Calories")} kcal, {nutrients.get("Recommended_Protein")}g protein.
+
+{meals_text}
+
+Return plain text only.
+"""
+
+    try:
+        response = model.generate_content(prompt)
+        return (response.text or "").strip()
+    except Exception:
+        return ""
+
+
+# ------------------------------------------------------------------
+# Multi-day plans (one call, compact prompt, streamed parsing)
+# ------------------------------------------------------------------
+CHARS_PER_TOKEN = 4  # rough estimate for English + numbers
+OUTPUT_TOKENS_PER_DAY = 400  # typical size of one day object in the response
+MIN_FOODS = 5
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap local token estimate (no API round trip)."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def encode_foods_compact(foods: list) -> str:
+    """One short row per food: name|kcal|protein|carbs|fat (per listed quantity)."""
+    rows = ["name|qty|kcal|p|c|f"]
+    for f in foods:
+        rows.append(
+            f"{f.get('Food')}|{str(f.get('Quantity') or '').strip()}|"
+            f"{float(f.get('Calories (kcal)') or 0):.0f}|{float(f.get('Protein (g)') or 0):.0f}|"
+            f"{float(f.get('Carbohydrate (g)') or 0):.0f}|{float(f.get('Fat (g)') or 0):.0f}"
+        )
+    return "\n".join(rows)
+
+
+def _multi_day_prompt(nutrients: dict, foods: list, patient: dict, days: int) -> str:
+    return f"""Clinical dietician. Plan {days} days of meals for an elderly user. Vary foods across days.
+Patient: age={patient.get("Age")}; gender={patient.get("Gender")}; disease={patient.get("Chronic_Disease")}; diet={patient.get("Dietary_Habits")}; allergies={patient.get("Allergies")}; cuisine={patient.get("Preferred_Cuisine")}; aversions={patient.get("Food_Aversions")}
+Daily targets: kcal={nutrients.get("Recommended_Calories"):.0f}; protein={nutrients.get("Recommended_Protein"):.0f}g; carbs={nutrients.get("Recommended_Carbs"):.0f}g; fat={nutrients.get("Recommended_Fats"):.0f}g; plan={nutrients.get("Recommended_Meal_Plan")}
+Allowed foods:
+{encode_foods_compact(foods)}
+Use only allowed foods. Return STRICT JSON ONLY: an array of {days} objects, one per day, in order:
+[{{"day":1,"meals":{{"breakfast":[{{"food_name":"...","portion":"...","notes":"..."}}],"lunch":[...],"dinner":[...],"snacks":[...]}}}}]
+"""
+
+
+def build_multi_day_prompt(nutrients: dict, foods: list, patient: dict, days: int, token_budget: int):
+    """
+    Build the prompt, dropping the lowest-ranked foods until the estimated
+    prompt + response size fits `token_budget`.
+
+    Returns:
+        (prompt, foods_used, estimated_tokens)
+    """
+    foods = list(foods)
+    while True:
+        prompt = _multi_day_prompt(nutrients, foods, patient, days)
+        estimated = estimate_tokens(prompt) + days * OUTPUT_TOKENS_PER_DAY
+        if estimated <= token_budget:
+            return prompt, foods, estimated
+        if len(foods) <= MIN_FOODS:
+            raise TokenBudgetExceeded(
+                f"Meal plan request needs ~{estimated} tokens, budget is {token_budget}"
+            )
+        foods = foods[:-1]  # foods are sorted best-first by get_food_recommendations
+
+
+def generate_meal_plans(
+    nutrients: dict,
+    foods: list,
+    patient: dict,
+    days: int,
+    token_budget: int,
+    on_day=None,
+) -> dict:
+    """
+    Generate a `days`-day plan with a single streamed Gemini call.
+
+    Args:
+        on_day: optional callback invoked with each day object as soon as
+            it has been fully received; at most `days` days are accepted
+
+    Returns:
+        {"days": [...], "usage": {...}} where usage reports token counts and
+        latency, in total and per plan-day.
+    """
+    prompt, foods_used, estimated = build_multi_day_prompt(
+        nutrients, foods, patient, days, token_budget
+    )
+
+    started = time.perf_counter()
+    first_day_s = None
+    parser = DayStreamParser()
+    plan_days = []
+
+    response = model.generate_content(prompt, stream=True)
+    for chunk in response:
+        for day in parser.feed(chunk.text or ""):
+            if len(plan_days) == days:
+                break
+            if first_day_s is None:
+                first_day_s = time.perf_counter() - started
+            plan_days.append(day)
+            if on_day is not None:
+                on_day(day)
+        if parser.finished or len(plan_days) == days:
+            break
+
+    elapsed = time.perf_counter() - started
+    usage = getattr(response, "usage_metadata", None)
+    prompt_tokens = getattr(usage, "prompt_token_count", None)
+    output_tokens = getattr(usage, "candidates_token_count", None)
+    n = max(len(plan_days), 1)
+
+    return {
+        "days": plan_days,
+        "usage": {
+            "days_requested": days,
+            "days_received": len(plan_days),
+            "foods_in_prompt": len(foods_used),
+            "estimated_tokens": estimated,
+            "prompt_tokens": prompt_tokens,
+            "output_tokens": output_tokens,
+            "tokens_per_day": (
+                round((prompt_tokens + output_tokens) / n, 1)
+                if prompt_tokens is not None and output_tokens is not None else None
+            ),
+            "latency_s": round(elapsed, 3),
+            "latency_per_day_s": round(elapsed / n, 3),
+            "first_day_latency_s": round(first_day_s, 3) if first_day_s is not None else None,
+        },
+    }
@@ -1,17 +1,46 @@
 """Business logic / service layer for patient operations.
 
 This module should interact with Firestore via helper utilities and
-provide high-level methods consumed by API routes.
+provide high-level methods consumed by API routes. Profile reads go
+through the process-local document cache (see app.services.cache).
 """
-from typing import List
+from typing import Any, Dict, List, Optional
+
+from app.core import firebase
 from app.models.patient import Patient
+from app.services.cache import get_cache
+
+COLLECTION = "patients"
 
 
 class PatientService:
     def __init__(self):
-        # Initialize Firestore client here (not implemented)
-        pass
+        self.cache = get_cache(COLLECTION)
+
+    def _collection(self):
+        return firebase.db.collection(COLLECTION)
 
     def list_patients(self) -> List[Patient]:
         # Placeholder: query Firestore and return Patient instances
         return []
+
+    def get_patient(self, patient_id: str) -> Optional[Dict[str, Any]]:
+        """Return the patient profile dict (treat as read-only) or None."""
+        patient = self.cache.get(patient_id)
+        if patient is not None:
+            return patient
+
+        doc = self._collection().document(patient_id).get()
+        if not doc.exists:
+            return None
+        patient = doc.to_dict()
+        self.cache.set(patient_id, patient)
+        return patient
+
+    def create_patient(self, data: Dict[str, Any]) -> str:
+        _, ref = self._collection().add(data)
+        self.cache.set(ref.id, data)
+        return ref.id
+
+
+patient_service = PatientService()
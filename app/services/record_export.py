@@ -0,0 +1,229 @@
+"""
+Incremental columnar export of health records for offline ML training.
+
+Reads `health_records` in timestamp order, page by page, starting after the
+watermark persisted by the previous run. Each page is flattened into typed
+columns (HealthData fields + known vitals) and appended as date-partitioned
+Parquet (or Arrow IPC) files:
+
+    <out_dir>/
+        _watermark.json
+        date=2024-05-01/part-<run_id>-00000.parquet
+        date=2024-05-02/part-<run_id>-00000.parquet
+
+Nightly runs therefore only transfer documents written since the last run.
+
+Usage:
+    python -m app.services.record_export --out exports/health_records
+"""
+
+import argparse
+import json
+import os
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union, get_args, get_origin
+
+from app.models.health_data import HealthData
+from app.services.vitals_service import VITAL_FIELDS
+
+WATERMARK_FILE = "_watermark.json"
+FORMATS = ("parquet", "arrow")
+
+
+def _pa():
+    try:
+        import pyarrow
+    except ImportError as exc:
+        raise RuntimeError(
+            "pyarrow is required for record export: pip install -r requirements-ml.txt"
+        ) from exc
+    return pyarrow
+
+
+# ------------------------------------------------------------------
+# Schema
+# ------------------------------------------------------------------
+def _model_fields(model) -> Dict[str, Any]:
+    # pydantic v2: model_fields (FieldInfo); v1: __fields__ (ModelField)
+    return getattr(model, "model_fields", None) or model.__fields__
+
+
+def _field_type(model_field) -> Any:
+    """Plain Python type of a model field, with Optional[...] unwrapped."""
+    tp = getattr(model_field, "outer_type_", None) or model_field.annotation
+    if get_origin(tp) is Union:
+        args = [a for a in get_args(tp) if a is not type(None)]
+        tp = args[0] if len(args) == 1 else tp
+    return tp
+
+
+def build_schema():
+    """Typed Arrow schema derived from the HealthData model."""
+    pa = _pa()
+    # bool before int (bool subclasses int); subclasses cover constrained
+    # types such as pydantic v1's ConstrainedIntValue for Field(ge=0)
+    type_map = [(bool, pa.bool_()), (int, pa.int64()), (float, pa.float64()), (str, pa.string())]
+
+    def _arrow_type(tp):
+        if not isinstance(tp, type):
+            return pa.string()
+        return next((t for py, t in type_map if issubclass(tp, py)), pa.string())
+
+    fields = [
+        pa.field("record_id", pa.string()),
+        pa.field("timestamp", pa.timestamp("us", tz="UTC")),
+        pa.field("created_by", pa.string()),
+        pa.field("nutrition_approved", pa.bool_()),
+    ]
+    for name, model_field in _model_fields(HealthData).items():
+        if name in ("id", "timestamp", "vitals"):
+            continue
+        fields.append(pa.field(name, _arrow_type(_field_type(model_field))))
+    fields.extend(pa.field(f"vitals_{name}", pa.float64()) for name in VITAL_FIELDS)
+    return pa.schema(fields)
+
+
+def flatten(doc_id: str, data: Dict[str, Any], schema) -> Dict[str, Any]:
+    """Flatten one Firestore document into a row matching `schema`."""
+    vitals = data.get("vitals") or {}
+    row: Dict[str, Any] = {}
+    for field in schema:
+        name = field.name
+        if name == "record_id":
+            row[name] = doc_id
+        elif name == "timestamp":
+            row[name] = datetime.fromisoformat(data["timestamp"])
+        elif name.startswith("vitals_"):
+            value = vitals.get(name[len("vitals_"):])
+            row[name] = float(value) if isinstance(value, (int, float)) else None
+        else:
+            row[name] = data.get(name)
+    return row
+
+
+# ------------------------------------------------------------------
+# Watermark
+# ------------------------------------------------------------------
+def read_watermark(out_dir: Path) -> Optional[Dict[str, Any]]:
+    """Last exported (timestamp, document_id), or None before the first run."""
+    path = out_dir / WATERMARK_FILE
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def write_watermark(out_dir: Path, timestamp: str, document_id: str, exported: int) -> None:
+    path = out_dir / WATERMARK_FILE
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps({
+        "timestamp": timestamp,
+        "document_id": document_id,
+        "exported": exported,
+        "updated_at": datetime.utcnow().isoformat(),
+    }))
+    os.replace(tmp, path)  # atomic: a crash never leaves a half-written watermark
+
+
+# ------------------------------------------------------------------
+# Export
+# ------------------------------------------------------------------
+def _write_page(rows: List[Dict[str, Any]], schema, out_dir: Path, name: str, fmt: str) -> None:
+    pa = _pa()
+
+    by_date: Dict[str, List[Dict[str, Any]]] = {}
+    for row in rows:
+        by_date.setdefault(row["timestamp"].date().isoformat(), []).append(row)
+
+    for day, day_rows in by_date.items():
+        table = pa.Table.from_pylist(day_rows, schema=schema)
+        part_dir = out_dir / f"date={day}"
+        part_dir.mkdir(parents=True, exist_ok=True)
+
+        if fmt == "parquet":
+            import pyarrow.parquet as pq
+
+            pq.write_table(table, part_dir / f"{name}.parquet", compression="zstd")
+        else:
+            import pyarrow.ipc as ipc
+
+            with ipc.new_file(str(part_dir / f"{name}.arrow"), schema) as writer:
+                writer.write_table(table)
+
+
+def export_records(db, out_dir: str | Path, page_size: int = 1000, fmt: str = "parquet") -> int:
+    """
+    Export records newer than the stored watermark.
+
+    Args:
+        db: Firestore client (any object with the same query API works)
+        out_dir: dataset root directory
+        page_size: documents fetched per query page
+        fmt: "parquet" or "arrow"
+
+    Returns:
+        Number of exported documents.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"fmt must be one of {FORMATS}")
+
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    schema = build_schema()
+    run_id = uuid.uuid4().hex[:8]
+
+    # (timestamp, document id) order: the id breaks timestamp ties, so a run
+    # that ended in the middle of a tie resumes exactly where it stopped
+    coll = db.collection("health_records")
+    ordered = coll.order_by("timestamp").order_by("__name__")
+    query = ordered
+    watermark = read_watermark(out)
+    if watermark and watermark.get("document_id"):
+        query = ordered.start_after({
+            "timestamp": watermark["timestamp"],
+            "__name__": coll.document(watermark["document_id"]),
+        })
+    elif watermark:
+        # Watermark written before document ids were stored
+        query = ordered.start_after({"timestamp": watermark["timestamp"]})
+
+    exported = 0
+    page_no = 0
+    while True:
+        docs = list(query.limit(page_size).stream())
+        if not docs:
+            break
+
+        # order_by("timestamp") only returns documents that have the field
+        rows = [flatten(d.id, d.to_dict(), schema) for d in docs]
+        _write_page(rows, schema, out, f"part-{run_id}-{page_no:05d}", fmt)
+
+        # Only advance the watermark once the page's files are on disk
+        exported += len(rows)
+        write_watermark(out, docs[-1].to_dict()["timestamp"], docs[-1].id, exported)
+
+        page_no += 1
+        if len(docs) < page_size:
+            break
+        query = ordered.start_after(docs[-1])
+
+    return exported
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Export health records for training")
+    parser.add_argument("--out", required=True, help="Output dataset directory")
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--format", choices=FORMATS, default="parquet")
+    args = parser.parse_args(argv)
+
+    from app.core import firebase
+
+    firebase.init_firebase()
+    count = export_records(firebase.db, args.out, args.page_size, args.format)
+    print(f"[INFO] Exported {count} health records to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+Vitals time-series helpers.
+
+Every submitted health record also updates one rollup document per patient
+per day in the `vitals_daily` collection:
+
+    vitals_daily/{patient_id}_{YYYY-MM-DD}
+        patient_id: "..."
+        date: "YYYY-MM-DD"
+        stats:
+            blood_pressure_systolic: {min, max, sum, count}
+            ...
+
+The rollup is maintained with Firestore field transforms (Minimum, Maximum,
+Increment) so concurrent submissions never need a read-modify-write.
+Chart queries then read one small document per day instead of every full
+health record (with its meal-plan payload).
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from firebase_admin import firestore
+
+from app.core import firebase
+
+ROLLUP_COLLECTION = "vitals_daily"
+
+# Numeric fields tracked as vitals (root field first, `vitals.<name>` fallback)
+VITAL_FIELDS: List[str] = [
+    "weight_kg",
+    "bmi",
+    "blood_pressure_systolic",
+    "blood_pressure_diastolic",
+    "cholesterol_level",
+    "blood_sugar_level",
+    "sleep_hours",
+    "daily_steps",
+]
+
+RESOLUTIONS = ("raw", "day", "week")
+
+
+# ------------------------------------------------------------------
+# Write path
+# ------------------------------------------------------------------
+def extract_vitals(record: Dict[str, Any]) -> Dict[str, float]:
+    """Pick numeric vitals from a record (root fields win over `vitals`)."""
+    nested = record.get("vitals") or {}
+    out: Dict[str, float] = {}
+    for name in VITAL_FIELDS:
+        value = record.get(name)
+        if value is None:
+            value = nested.get(name)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            out[name] = float(value)
+    return out
+
+
+def rollup_ref(patient_id: str, day: str):
+    return firebase.db.collection(ROLLUP_COLLECTION).document(f"{patient_id}_{day}")
+
+
+def add_rollup(batch, patient_id: str, timestamp: str, vitals: Dict[str, float]) -> None:
+    """Queue the daily rollup update for one record on a Firestore WriteBatch."""
+    if not vitals:
+        return
+    day = timestamp[:10]
+    stats = {
+        name: {
+            "min": firestore.Minimum(value),
+            "max": firestore.Maximum(value),
+            "sum": firestore.Increment(value),
+            "count": firestore.Increment(1),
+        }
+        for name, value in vitals.items()
+    }
+    batch.set(
+        rollup_ref(patient_id, day),
+        {"patient_id": patient_id, "date": day, "stats": stats},
+        merge=True,
+    )
+
+
+# ------------------------------------------------------------------
+# Read path
+# ------------------------------------------------------------------
+def query_rollups(
+    patient_id: str,
+    start: date,
+    end: date,
+    fields: Iterable[str],
+    resolution: str = "day",
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Return {vital: [{t, min, max, mean, count}, ...]} from daily rollups."""
+    fields = list(fields)
+    docs = (
+        firebase.db.collection(ROLLUP_COLLECTION)
+        .where("patient_id", "==", patient_id)
+        .where("date", ">=", start.isoformat())
+        .where("date", "<=", end.isoformat())
+        .order_by("date")
+        .stream()
+    )
+
+    # bucket key -> vital -> merged stats
+    buckets: Dict[str, Dict[str, Dict[str, float]]] = {}
+    for doc in docs:
+        data = doc.to_dict() or {}
+        key = _bucket_key(data["date"], resolution)
+        bucket = buckets.setdefault(key, {})
+        for name, s in (data.get("stats") or {}).items():
+            if name not in fields or not s.get("count"):
+                continue
+            merged = bucket.get(name)
+            if merged is None:
+                bucket[name] = dict(s)
+            else:
+                merged["min"] = min(merged["min"], s["min"])
+                merged["max"] = max(merged["max"], s["max"])
+                merged["sum"] += s["sum"]
+                merged["count"] += s["count"]
+
+    series: Dict[str, List[Dict[str, Any]]] = {name: [] for name in fields}
+    for key in sorted(buckets):
+        for name, s in buckets[key].items():
+            series[name].append({
+                "t": key,
+                "min": s["min"],
+                "max": s["max"],
+                "mean": round(s["sum"] / s["count"], 2),
+                "count": int(s["count"]),
+            })
+    return series
+
+
+def query_raw(
+    patient_id: str,
+    start: date,
+    end: date,
+    fields: Iterable[str],
+    max_points: int = 500,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Return {vital: [{t, value}, ...]} from raw records, LTTB-downsampled."""
+    fields = list(fields)
+    projection = ["timestamp", *fields, *(f"vitals.{name}" for name in fields)]
+    docs = (
+        firebase.db.collection("health_records")
+        .where("patient_id", "==", patient_id)
+        .where("timestamp", ">=", start.isoformat())
+        .where("timestamp", "<", (end + timedelta(days=1)).isoformat())
+        .order_by("timestamp")
+        .select(projection)
+        .stream()
+    )
+
+    points: Dict[str, List[Tuple[float, float, str]]] = {name: [] for name in fields}
+    for doc in docs:
+        data = doc.to_dict() or {}
+        ts = data.get("timestamp")
+        if not ts:
+            continue
+        x = datetime.fromisoformat(ts).timestamp()
+        for name, value in extract_vitals(data).items():
+            if name in points:
+                points[name].append((x, value, ts))
+
+    return {
+        name: [{"t": ts, "value": y} for _, y, ts in lttb(pts, max_points)]
+        for name, pts in points.items()
+    }
+
+
+def _bucket_key(day: str, resolution: str) -> str:
+    if resolution == "week":
+        d = date.fromisoformat(day)
+        return (d - timedelta(days=d.weekday())).isoformat()
+    return day
+
+
+# ------------------------------------------------------------------
+# Downsampling
+# ------------------------------------------------------------------
+def lttb(points: List[Tuple], threshold: int) -> List[Tuple]:
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+
+    `points` are tuples sorted by x whose first two items are (x, y); extra
+    items are carried through unchanged. Keeps the first and last point and
+    the visually most significant point of every bucket in between.
+    """
+    n = len(points)
+    if threshold >= n or threshold < 3:
+        return list(points)
+
+    sampled = [points[0]]
+    bucket_size = (n - 2) / (threshold - 2)
+    a = 0
+
+    for i in range(threshold - 2):
+        # Average of the next bucket is the third triangle vertex
+        next_start = int((i + 1) * bucket_size) + 1
+        next_end = min(int((i + 2) * bucket_size) + 1, n)
+        next_bucket = points[next_start:next_end] or [points[-1]]
+        avg_x = sum(p[0] for p in next_bucket) / len(next_bucket)
+        avg_y = sum(p[1] for p in next_bucket) / len(next_bucket)
+
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+        ax, ay = points[a][0], points[a][1]
+
+        best: Optional[int] = None
+        best_area = -1.0
+        for j in range(start, end):
+            area = abs(
+                (ax - avg_x) * (points[j][1] - ay) - (ax - points[j][0]) * (avg_y - ay)
+            )
+            if area > best_area:
+                best_area = area
+                best = j
+
+        sampled.append(points[best])
+        a = best
+
+    sampled.append(points[-1])
+    return sampled
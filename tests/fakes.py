@@ -0,0 +1,124 @@
+"""In-memory stand-ins for the Firestore client used in tests.
+
+Only the query surface the services rely on is implemented:
+collection / document / add / where (==) / order_by / start_after / limit /
+stream. Cursors assume ascending order.
+"""
+import uuid
+from typing import Any, Dict, List, Optional
+
+
+class FakeDocumentReference:
+    def __init__(self, collection: "FakeCollection", doc_id: str):
+        self._collection = collection
+        self.id = doc_id
+
+    def set(self, data: Dict[str, Any]) -> None:
+        self._collection._docs[self.id] = dict(data)
+
+    def get(self) -> "FakeDocumentSnapshot":
+        return FakeDocumentSnapshot(self.id, self._collection._docs.get(self.id))
+
+
+class FakeDocumentSnapshot:
+    def __init__(self, doc_id: str, data: Optional[Dict[str, Any]]):
+        self.id = doc_id
+        self._data = data
+        self.exists = data is not None
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        return dict(self._data) if self._data is not None else None
+
+
+class FakeQuery:
+    def __init__(
+        self, collection: "FakeCollection", filters=(), orders=(), descending=(), cursor=None, limit=None
+    ):
+        self._collection = collection
+        self._filters: List[tuple] = list(filters)
+        self._orders: List[str] = list(orders)
+        self._descending: List[bool] = list(descending)
+        self._cursor = cursor
+        self._limit = limit
+
+    def _copy(self, **changes) -> "FakeQuery":
+        state = {
+            "filters": self._filters,
+            "orders": self._orders,
+            "descending": self._descending,
+            "cursor": self._cursor,
+            "limit": self._limit,
+            **changes,
+        }
+        return FakeQuery(self._collection, **state)
+
+    def where(self, field: str, op: str, value: Any) -> "FakeQuery":
+        assert op == "==", "only equality filters are faked"
+        return self._copy(filters=[*self._filters, (field, value)])
+
+    def order_by(self, field: str, direction: str = "ASCENDING") -> "FakeQuery":
+        return self._copy(
+            orders=[*self._orders, field],
+            descending=[*self._descending, direction == "DESCENDING"],
+        )
+
+    def start_after(self, cursor) -> "FakeQuery":
+        return self._copy(cursor=cursor)
+
+    def limit(self, count: int) -> "FakeQuery":
+        return self._copy(limit=count)
+
+    def _key(self, doc_id: str, data: Dict[str, Any]) -> tuple:
+        return tuple(doc_id if f == "__name__" else data[f] for f in self._orders)
+
+    def _cursor_key(self) -> tuple:
+        if isinstance(self._cursor, FakeDocumentSnapshot):
+            return self._key(self._cursor.id, self._cursor.to_dict())
+        # Dict cursors may cover a prefix of the order fields
+        values = []
+        for f in self._orders:
+            if f not in self._cursor:
+                break
+            value = self._cursor[f]
+            values.append(value.id if isinstance(value, FakeDocumentReference) else value)
+        return tuple(values)
+
+    def stream(self):
+        # Like Firestore, ordering on a field drops documents without it
+        docs = [
+            (doc_id, data) for doc_id, data in self._collection._docs.items()
+            if all(f == "__name__" or f in data for f in self._orders)
+            and all(data.get(f) == v for f, v in self._filters)
+        ]
+        # Stable sorts from the last order field to the first
+        for i in reversed(range(len(self._orders))):
+            docs.sort(key=lambda d: self._key(*d)[i], reverse=self._descending[i])
+
+        if self._cursor is not None:
+            after = self._cursor_key()
+            docs = [d for d in docs if self._key(*d)[:len(after)] > after]
+        if self._limit is not None:
+            docs = docs[:self._limit]
+        return iter([FakeDocumentSnapshot(doc_id, data) for doc_id, data in docs])
+
+
+class FakeCollection(FakeQuery):
+    def __init__(self):
+        self._docs: Dict[str, Dict[str, Any]] = {}
+        super().__init__(self)
+
+    def document(self, doc_id: Optional[str] = None) -> FakeDocumentReference:
+        return FakeDocumentReference(self, doc_id or uuid.uuid4().hex)
+
+    def add(self, data: Dict[str, Any]):
+        ref = self.document()
+        ref.set(data)
+        return None, ref
+
+
+class FakeFirestore:
+    def __init__(self):
+        self._collections: Dict[str, FakeCollection] = {}
+
+    def collection(self, name: str) -> FakeCollection:
+        return self._collections.setdefault(name, FakeCollection())
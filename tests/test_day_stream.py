@@ -0,0 +1,51 @@
+import json
+
+import pytest
+
+from app.services.day_stream import DayStreamParser
+
+DAYS = [
+    {"day": 1, "meals": {"breakfast": [{"food_name": "Oats", "portion": "1 cup", "notes": "a}[\""}],
+                         "lunch": [{"food_name": "Rice"}], "dinner": [], "snacks": []}},
+    {"day": 2, "meals": {"breakfast": [{"food_name": "Egg"}], "lunch": [], "dinner": [], "snacks": []}},
+]
+
+
+def _parse(text, step):
+    parser = DayStreamParser()
+    out = []
+    for i in range(0, len(text), step):
+        out += parser.feed(text[i:i + step])
+    return out, parser
+
+
+@pytest.mark.parametrize("step", [1, 7, 10000])
+def test_bare_array(step):
+    days, parser = _parse(json.dumps(DAYS), step)
+    assert days == DAYS
+    assert parser.finished
+
+
+@pytest.mark.parametrize("step", [1, 7, 10000])
+def test_wrapped_array(step):
+    days, _ = _parse(json.dumps({"days": DAYS}), step)
+    assert days == DAYS
+
+
+@pytest.mark.parametrize("step", [1, 7, 10000])
+def test_single_object_is_one_day_not_its_food_items(step):
+    days, _ = _parse(json.dumps(DAYS[0]), step)
+    assert days == [DAYS[0]]
+
+
+@pytest.mark.parametrize("step", [1, 7, 10000])
+def test_preamble_and_trailing_text_are_ignored(step):
+    text = 'Here is the "plan":\n```json\n' + json.dumps(DAYS) + "\n```\nAdjust [portions] {as needed}."
+    days, parser = _parse(text, step)
+    assert days == DAYS
+    assert parser.finished
+
+
+def test_objects_without_meals_are_dropped():
+    days, _ = _parse(json.dumps([{"day": 1}, DAYS[1], "x"]), 5)
+    assert days == [DAYS[1]]
@@ -0,0 +1,40 @@
+import pytest
+
+from app.core import firebase
+from app.services import cache
+from app.services.health_service import HealthService
+from tests.fakes import FakeFirestore
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(firebase, "db", FakeFirestore())
+    monkeypatch.setattr(cache, "_CACHES", {})
+    return HealthService()
+
+
+def _add(record_id, patient_id, timestamp):
+    firebase.db.collection("health_records").document(record_id).set(
+        {"patient_id": patient_id, "timestamp": timestamp}
+    )
+
+
+def test_latest_record_is_cached_by_patient(service):
+    _add("r1", "pat1", "2024-05-01T08:00:00+00:00")
+    _add("r2", "pat1", "2024-05-02T08:00:00+00:00")
+    _add("r3", "pat2", "2024-05-03T08:00:00+00:00")
+
+    assert service.get_latest_record("pat1")["id"] == "r2"
+    assert service.latest.get("pat1") == "r2"
+
+    service.record_created("r4", {"patient_id": "pat1", "timestamp": "2024-05-04T08:00:00+00:00"})
+    assert service.get_latest_record("pat1")["id"] == "r4"
+
+
+def test_pointer_keys_are_not_record_ids(service):
+    _add("r1", "pat1", "2024-05-01T08:00:00+00:00")
+    service.get_latest_record("pat1")
+
+    assert service.get_record("latest:pat1") is None
+    assert service.get_record("pat1") is None
+    assert service.latest.get("pat1") == "r1"
@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+from app.services.idempotency import IdempotencyKeyReused, IdempotencyStore, request_key
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def _counting(result="ok", delay=0.0, error=None):
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return result
+
+    return fn, calls
+
+
+def test_concurrent_duplicates_join_one_execution():
+    async def scenario():
+        store = IdempotencyStore()
+        fn, calls = _counting(delay=0.01)
+        results = await asyncio.gather(*(store.run("k", 60, fn, "d") for _ in range(3)))
+        assert results == [("ok", False), ("ok", True), ("ok", True)]
+        assert len(calls) == 1
+        assert store.stats == {"executed": 1, "replayed": 0, "joined": 2, "mismatched": 0}
+
+    _run(scenario())
+
+
+def test_finished_result_is_replayed_until_ttl():
+    async def scenario():
+        store = IdempotencyStore()
+        fn, calls = _counting()
+        assert await store.run("k", 0.05, fn, "d") == ("ok", False)
+        assert await store.run("k", 0.05, fn, "d") == ("ok", True)
+        await asyncio.sleep(0.06)
+        assert not store.has("k")
+        assert await store.run("k", 0.05, fn, "d") == ("ok", False)
+        assert len(calls) == 2
+
+    _run(scenario())
+
+
+def test_key_reuse_with_different_body_is_rejected():
+    async def scenario():
+        store = IdempotencyStore()
+        fn, calls = _counting()
+        key, ttl, digest = request_key("u1", "abc", {"weight_kg": 60})
+        other_key, _, other_digest = request_key("u1", "abc", {"weight_kg": 61})
+        assert key == other_key and digest != other_digest
+
+        await store.run(key, ttl, fn, digest)
+        with pytest.raises(IdempotencyKeyReused):
+            await store.run(other_key, ttl, fn, other_digest)
+        assert len(calls) == 1 and store.stats["mismatched"] == 1
+
+    _run(scenario())
+
+
+def test_failure_drops_key_and_propagates_to_joiners():
+    async def scenario():
+        store = IdempotencyStore()
+        fn, calls = _counting(delay=0.01, error=RuntimeError("boom"))
+        results = await asyncio.gather(
+            store.run("k", 60, fn, "d"), store.run("k", 60, fn, "d"), return_exceptions=True
+        )
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert not store.has("k")
+
+        ok, _ = _counting()
+        assert await store.run("k", 60, ok, "d") == ("ok", False)
+        assert len(calls) == 1
+
+    _run(scenario())
+
+
+def test_body_keys_are_per_user():
+    key_a, _, _ = request_key("u1", None, {"x": 1})
+    key_b, _, _ = request_key("u2", None, {"x": 1})
+    assert key_a != key_b
@@ -0,0 +1,90 @@
+from app.services.meal_optimizer import (
+    MEAL_SHARES,
+    TARGET_KEYS,
+    optimize_meal_plan,
+    within_tolerance,
+)
+
+NUTRIENTS = {
+    "Recommended_Calories": 1800.0,
+    "Recommended_Protein": 70.0,
+    "Recommended_Carbs": 230.0,
+    "Recommended_Fats": 60.0,
+}
+
+
+def _food(name, kcal, protein, carbs, fat, quantity="100g"):
+    return {
+        "Food": name,
+        "Quantity": quantity,
+        "Calories (kcal)": kcal,
+        "Protein (g)": protein,
+        "Carbohydrate (g)": carbs,
+        "Fat (g)": fat,
+    }
+
+
+FOODS = [
+    _food("Brown Rice", 110, 2.5, 23, 1, "80g"),
+    _food("Chicken Breast", 165, 31, 0, 3.6),
+    _food("Peanut Butter Toast", 250, 9, 25, 13, "1 slice"),
+    _food("Lentil Curry", 180, 12, 25, 4, "150g"),
+    _food("Salmon", 210, 22, 0, 13),
+    _food("Banana", 105, 1.3, 27, 0.4, "1 piece"),
+    _food("Oatmeal", 150, 5, 27, 3, "40g"),
+    _food("Greek Yogurt", 100, 10, 4, 5, "150ml"),
+    _food("Steamed Vegetables", 60, 3, 11, 0.5),
+    _food("Olive Oil Dressing", 120, 0, 0, 14, "15ml"),
+    _food("Whole Wheat Pasta", 175, 7, 37, 1),
+    _food("Boiled Egg", 78, 6, 0.6, 5, "1 piece"),
+    _food("Apple", 95, 0.5, 25, 0.3, "1 piece"),
+    _food("Tofu Stir Fry", 190, 12, 10, 11, "150g"),
+    _food("Sweet Potato", 115, 2, 27, 0.2, "130g"),
+]
+
+
+def _names(plan):
+    return [item["food_name"] for items in plan["meals"].values() for item in items]
+
+
+def test_plan_schema_and_totals_on_target():
+    plan, totals = optimize_meal_plan(NUTRIENTS, FOODS, {})
+
+    assert plan["day"] == 1
+    assert list(plan["meals"]) == list(MEAL_SHARES)
+    for items in plan["meals"].values():
+        for item in items:
+            assert set(item) == {"food_name", "portion", "notes"}
+    assert set(totals) == set(TARGET_KEYS)
+    assert within_tolerance(totals, NUTRIENTS)
+
+
+def test_totals_match_the_listed_portions():
+    plan, totals = optimize_meal_plan(NUTRIENTS, FOODS, {})
+    kcal = sum(
+        float(item["notes"].split(" kcal")[0])
+        for items in plan["meals"].values() for item in items
+    )
+    assert abs(kcal - totals["Recommended_Calories"]) <= len(_names(plan))
+
+
+def test_allergies_and_aversions_are_excluded():
+    patient = {"Allergies": "peanut", "Food_Aversions": "salmon; yogurt"}
+    plan, _ = optimize_meal_plan(NUTRIENTS, FOODS, patient)
+
+    names = " ".join(_names(plan)).lower()
+    assert names
+    assert "peanut" not in names and "salmon" not in names and "yogurt" not in names
+
+
+def test_small_shortlist_misses_targets():
+    plan, totals = optimize_meal_plan(NUTRIENTS, [FOODS[0]], {})
+    assert not within_tolerance(totals, NUTRIENTS)
+    assert totals["Recommended_Calories"] < NUTRIENTS["Recommended_Calories"]
+
+
+def test_met_macro_does_not_block_later_meals():
+    # Protein is met before snacks; snacks must still fill the calorie gap
+    plan, totals = optimize_meal_plan(NUTRIENTS, FOODS[:10], {})
+    assert all(plan["meals"].values())
+    assert abs(totals["Recommended_Calories"] - 1800) <= 180
@@ -0,0 +1,31 @@
+import threading
+import time
+
+from app.core.profiling import StackSampler
+
+
+def _spin(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def test_idle_and_non_app_threads_are_not_sampled():
+    idle = threading.Event()
+    worker = threading.Thread(target=idle.wait, name="idle-worker")
+    busy = threading.Thread(target=_spin, args=(0.2,), name="library-thread")
+    worker.start()
+    busy.start()
+
+    sampler = StackSampler(0.005, threading.get_ident())
+    sampler.start()
+    _spin(0.2)
+    sampler.stop()
+    idle.set()
+    worker.join()
+    busy.join()
+
+    assert sampler.samples > 0
+    roots = {stack.split(";", 1)[0] for stack in sampler.stacks}
+    assert roots == {threading.current_thread().name}
+    assert any("test_profiling:_spin" in stack for stack in sampler.stacks)
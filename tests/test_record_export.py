@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+from app.services.record_export import WATERMARK_FILE, export_records
+from tests.fakes import FakeFirestore
+
+
+def _add(db, doc_id, timestamp, **fields):
+    db.collection("health_records").document(doc_id).set({
+        "patient_id": "p1",
+        "timestamp": timestamp,
+        "nutrition_approved": False,
+        "suggested_meal_plan": {"meal_plan": {"day": 1}},
+        **fields,
+    })
+
+
+def _exported_ids(out):
+    return sorted(pq.read_table(out).column("record_id").to_pylist())
+
+
+def test_export_is_incremental(tmp_path):
+    db = FakeFirestore()
+    _add(db, "a", "2024-05-01T08:00:00+00:00", age=70, weight_kg=61.5)
+    _add(db, "b", "2024-05-01T09:00:00+00:00", vitals={"bmi": 22.4})
+    _add(db, "c", "2024-05-02T08:00:00+00:00", smoking_habit=True)
+
+    assert export_records(db, tmp_path, page_size=2) == 3
+    assert sorted(p.name for p in tmp_path.glob("date=*")) == ["date=2024-05-01", "date=2024-05-02"]
+    watermark = json.loads((tmp_path / WATERMARK_FILE).read_text())
+    assert (watermark["timestamp"], watermark["document_id"]) == ("2024-05-02T08:00:00+00:00", "c")
+
+    # Nothing new -> nothing exported, watermark unchanged
+    assert export_records(db, tmp_path, page_size=2) == 0
+
+    # "d" shares the watermark's timestamp and must not be skipped
+    _add(db, "d", "2024-05-02T08:00:00+00:00")
+    _add(db, "e", "2024-05-03T08:00:00+00:00")
+    assert export_records(db, tmp_path, page_size=2) == 2
+
+    assert _exported_ids(tmp_path) == ["a", "b", "c", "d", "e"]
+    watermark = json.loads((tmp_path / WATERMARK_FILE).read_text())
+    assert watermark["document_id"] == "e"
+
+
+def test_export_columns_are_typed(tmp_path):
+    db = FakeFirestore()
+    _add(db, "a", "2024-05-01T08:00:00+00:00", age=70, weight_kg=61.5, vitals={"bmi": 22.4})
+
+    export_records(db, tmp_path)
+
+    table = pq.read_table(tmp_path)
+    assert str(table.schema.field("age").type) == "int64"
+    assert str(table.schema.field("weight_kg").type) == "double"
+    assert str(table.schema.field("smoking_habit").type) == "bool"
+    assert table.column("vitals_bmi").to_pylist() == [22.4]
+    assert "suggested_meal_plan" not in table.column_names
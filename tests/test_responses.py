@@ -0,0 +1,30 @@
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.testclient import TestClient
+
+from app.core.responses import CompressionMiddleware
+
+
+async def _app(scope, receive, send):
+    if scope["path"].startswith("/events/"):
+        async def frames():
+            yield "event: ping\ndata: 1\n\n"
+            yield "event: ping\ndata: 2\n\n"
+
+        response = StreamingResponse(frames(), media_type="text/event-stream")
+    else:
+        response = PlainTextResponse("x" * 4096)
+    await response(scope, receive, send)
+
+
+def test_event_stream_is_not_compressed_without_accept_header():
+    client = TestClient(CompressionMiddleware(_app))
+    with client.stream("GET", "/events/stream", headers={"Accept-Encoding": "gzip"}) as r:
+        assert "content-encoding" not in r.headers
+        assert r.read() == b"event: ping\ndata: 1\n\nevent: ping\ndata: 2\n\n"
+
+
+def test_large_responses_are_compressed():
+    client = TestClient(CompressionMiddleware(_app))
+    r = client.get("/health_records/", headers={"Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] in ("gzip", "br")
+    assert r.text == "x" * 4096